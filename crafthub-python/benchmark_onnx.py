@@ -0,0 +1,65 @@
+# benchmark_onnx.py
+"""
+Latence et débit de la traduction Marian selon le backend : PyTorch fp32,
+PyTorch int8 dynamique (optionnel) et ONNX Runtime, sur les descriptions
+produit du corpus local, en greedy et en beam search.
+
+    python benchmark_onnx.py --direction fr-en
+    python benchmark_onnx.py --direction fr-en --beams 1 4 --int8 --threads 4
+"""
+import argparse
+import json
+import os
+
+import torch
+from transformers import MarianMTModel, MarianTokenizer
+
+from benchmark_quantization import CORPUS, bleu, measure
+from model_registry import DEFAULT_PAIRS, hub_revision, parse_pairs
+from onnx_backend import load_onnx_marian
+from onnx_parity import generate
+from torch_runtime import quantize_int8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--direction", default="fr-en")
+    parser.add_argument("--beams", type=int, nargs="+", default=[1, 4], help="1 = greedy")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--int8", action="store_true", help="inclure PyTorch int8 dynamique")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads (ORT : ORT_NUM_THREADS)")
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+        os.environ.setdefault("ORT_NUM_THREADS", str(args.threads))
+    source, target = args.direction.lower().split("-", 1)
+    repo = parse_pairs(os.getenv("TRANSLATION_PAIRS", DEFAULT_PAIRS))[(source, target)]
+    with open(args.corpus, encoding="utf-8") as f:
+        texts = json.load(f)[f"translate_{source}_{target}"]
+
+    tok = MarianTokenizer.from_pretrained(repo)
+    backends = {"torch": (tok, MarianMTModel.from_pretrained(repo).eval())}
+    if args.int8:
+        backends["torch-int8"] = (tok, quantize_int8(MarianMTModel.from_pretrained(repo)))
+    backends["onnx"] = load_onnx_marian(repo, hub_revision(repo))
+
+    print(f"{repo} — {len(texts)} phrases, threads torch={torch.get_num_threads()}")
+    print(f"{'backend':<11} {'beams':>5} {'p50 ms':>9} {'p95 ms':>9} {'phrases/s':>10} {'BLEU vs torch':>14}")
+    for beams in args.beams:
+        reference = None
+        for name, (backend_tok, model) in backends.items():
+            generate(backend_tok, model, texts[:1], beams)  # échauffement
+            outputs, stats = measure(
+                lambda t: generate(backend_tok, model, [t], beams)[0],
+                lambda items: generate(backend_tok, model, items, beams),
+                texts, args.repeats
+            )
+            reference = reference or outputs
+            print(f"{name:<11} {beams:>5} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                  f"{stats['items_per_s']:>10.2f} {bleu(outputs, reference):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
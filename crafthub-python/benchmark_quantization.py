@@ -0,0 +1,192 @@
+# benchmark_quantization.py
+"""
+fp32 contre int8 dynamique (TORCH_QUANTIZE=int8) pour la traduction MarianMT
+(translator.py) et le résumé distilbart (resume.py), sur le corpus local
+benchmark_corpus.json : latence par élément, débit, mémoire (poids et RSS)
+et similarité des sorties int8 avec les sorties fp32 (BLEU pour la
+traduction, ROUGE-L pour le résumé).
+
+    python benchmark_quantization.py
+    python benchmark_quantization.py --tasks translate --threads 4 --interop-threads 1
+    python benchmark_quantization.py --tasks translate --quality fast
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+from collections import Counter
+from functools import partial
+
+import torch
+
+from decoding import DEFAULT_QUALITY, generation_kwargs, parse_quality
+from model_registry import model_size_bytes
+from torch_runtime import maybe_quantize
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus.json")
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / 2 ** 20 if psutil else float("nan")
+
+
+def bleu(hypotheses, references, max_n=4):
+    """BLEU de corpus (lissage +1 au-delà des unigrammes), sur 0-100."""
+    matches, totals = [0] * max_n, [0] * max_n
+    hyp_len = ref_len = 0
+    for hyp, ref in zip(hypotheses, references):
+        hyp, ref = hyp.split(), ref.split()
+        hyp_len, ref_len = hyp_len + len(hyp), ref_len + len(ref)
+        for n in range(1, max_n + 1):
+            hyp_ngrams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+            ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+            matches[n - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            totals[n - 1] += max(0, len(hyp) - n + 1)
+    if not hyp_len:
+        return 0.0
+    log_precision = 0.0
+    for n in range(max_n):
+        smooth = 0 if n == 0 else 1
+        if matches[n] + smooth == 0:
+            return 0.0
+        log_precision += math.log((matches[n] + smooth) / (totals[n] + smooth)) / max_n
+    brevity = 1.0 if hyp_len > ref_len else math.exp(1 - ref_len / hyp_len)
+    return 100 * brevity * math.exp(log_precision)
+
+
+def rouge_l(hypotheses, references):
+    """ROUGE-L F1 moyen (plus longue sous-séquence commune des mots), sur 0-100."""
+    scores = []
+    for hyp, ref in zip(hypotheses, references):
+        hyp, ref = hyp.lower().split(), ref.lower().split()
+        if not hyp or not ref:
+            scores.append(0.0)
+            continue
+        prev = [0] * (len(ref) + 1)
+        for h in hyp:
+            cur = [0]
+            for j, r in enumerate(ref):
+                cur.append(prev[j] + 1 if h == r else max(prev[j + 1], cur[j]))
+            prev = cur
+        lcs = prev[-1]
+        precision, recall = lcs / len(hyp), lcs / len(ref)
+        scores.append(0.0 if lcs == 0 else 2 * precision * recall / (precision + recall))
+    return 100 * sum(scores) / len(scores)
+
+
+def measure(run_one, run_batch, items, repeats):
+    latencies, outputs = [], []
+    for _ in range(repeats):
+        outputs = []
+        for item in items:
+            start = time.perf_counter()
+            outputs.append(run_one(item))
+            latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    run_batch(items)
+    throughput = len(items) / (time.perf_counter() - start)
+    latencies.sort()
+    return outputs, {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "items_per_s": throughput,
+    }
+
+
+def bench_translation(mode, corpus, repeats, quality=DEFAULT_QUALITY):
+    from transformers import MarianMTModel, MarianTokenizer
+
+    rss_before, start = rss_mb(), time.perf_counter()
+    repo = "Helsinki-NLP/opus-mt-fr-en"
+    tok = MarianTokenizer.from_pretrained(repo)
+    mdl = maybe_quantize(MarianMTModel.from_pretrained(repo).eval(), mode)
+    load_seconds = time.perf_counter() - start
+
+    # Mêmes réglages que translator.marian_translate_batch (budget adaptatif et mode `quality`)
+    def translate(texts):
+        batch = tok(list(texts), return_tensors="pt", padding=True, truncation=True)
+        input_tokens = int(batch["attention_mask"].sum(dim=1).max())
+        with torch.no_grad():
+            gen = mdl.generate(**batch, **generation_kwargs(quality, input_tokens))
+        return tok.batch_decode(gen, skip_special_tokens=True)
+
+    translate(corpus[:1])  # échauffement
+    outputs, stats = measure(lambda t: translate([t])[0], translate, corpus, repeats)
+    stats.update(load_s=load_seconds, weights_mb=model_size_bytes(mdl) / 2 ** 20, rss_delta_mb=rss_mb() - rss_before)
+    return outputs, stats
+
+
+def bench_summary(mode, corpus, repeats):
+    from transformers import pipeline
+
+    rss_before, start = rss_mb(), time.perf_counter()
+    summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", framework="pt")
+    summarizer.model = maybe_quantize(summarizer.model, mode)
+    load_seconds = time.perf_counter() - start
+
+    # Longueurs de resume.py, décodage déterministe pour comparer fp32 et int8
+    def summarize(review):
+        words = len(review.split())
+        return summarizer(review, min_length=max(10, int(words * 0.3)), max_length=max(30, int(words * 0.7)),
+                          do_sample=False, num_beams=4, early_stopping=True, truncation=True,
+                          no_repeat_ngram_size=3)[0]["summary_text"].strip()
+
+    summarize(corpus[0])  # échauffement
+    outputs, stats = measure(summarize, lambda items: [summarize(r) for r in items], corpus, repeats)
+    stats.update(load_s=load_seconds, weights_mb=model_size_bytes(summarizer.model) / 2 ** 20,
+                 rss_delta_mb=rss_mb() - rss_before)
+    return outputs, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", nargs="+", choices=["translate", "summarize"], default=["translate", "summarize"])
+    parser.add_argument("--repeats", type=int, default=3, help="passes sur le corpus pour la latence")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--interop-threads", type=int, default=None, help="torch.set_num_interop_threads")
+    parser.add_argument("--quality", default=None, help="mode de décodage de la traduction (défaut : TRANSLATE_QUALITY)")
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+    quality = parse_quality(args.quality)
+
+    if args.interop_threads:
+        torch.set_num_interop_threads(args.interop_threads)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    print(f"threads={torch.get_num_threads()} interop={torch.get_num_interop_threads()} quality={quality}")
+
+    tasks = {
+        "translate": (partial(bench_translation, quality=quality), corpus["translate_fr_en"], "BLEU", bleu),
+        "summarize": (bench_summary, corpus["summarize"], "ROUGE-L", rouge_l),
+    }
+    for task in args.tasks:
+        bench, items, metric_name, metric = tasks[task]
+        print(f"\n{task} ({len(items)} éléments)")
+        print(f"{'mode':<5} {'load s':>7} {'poids MB':>9} {'RSS +MB':>8} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'élém/s':>7} {metric_name + ' vs fp32':>15}")
+        reference = None
+        for mode in ["", "int8"]:
+            outputs, stats = bench(mode, items, args.repeats)
+            if reference is None:
+                reference = outputs
+            score = metric(outputs, reference)
+            print(f"{mode or 'fp32':<5} {stats['load_s']:>7.2f} {stats['weights_mb']:>9.1f} {stats['rss_delta_mb']:>8.1f} "
+                  f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['items_per_s']:>7.2f} {score:>15.1f}")
+            if mode:
+                for out, ref in zip(outputs, reference):
+                    if out != ref:
+                        print(f"  ≠ fp32 : {ref!r}\n    int8 : {out!r}")
+                        break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmark_translate.py
+"""
+Débit de la traduction FR->EN avec et sans micro-batching.
+
+N clients envoient chacun des phrases en boucle, comme des vendeurs qui
+traduisent en même temps. On compare un appel generate() par phrase
+(max_batch=1) aux réglages de micro-batching donnés en argument.
+
+    python benchmark_translate.py --clients 1 4 16 --requests 64
+    python benchmark_translate.py --clients 16 --batch 8 16 32 --wait 2 5 10
+    python benchmark_translate.py --clients 16 --quality fast best
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import torch
+
+SENTENCES = [
+    "Coussin en lin brodé à la main.",
+    "Ce collier met en valeur des pierres polies à la main.",
+    "Chaque vase est façonné par un potier artisanal, puis émaillé et cuit au four traditionnel.",
+    "Tapis tissé en laine naturelle, idéal pour le salon.",
+    "Bol en céramique, passe au lave-vaisselle.",
+    "Savon artisanal à l'huile d'olive et au miel, fabriqué en petites quantités.",
+    "Dimensions : 40 x 40 cm.",
+    "Disponible en différentes nuances naturelles (terre cuite, blanc cassé, bleu profond).",
+]
+
+
+def run(batcher, clients, requests_per_client):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        mine = []
+        for i in range(requests_per_client):
+            text = SENTENCES[(offset + i) % len(SENTENCES)]
+            start = time.perf_counter()
+            batcher.translate(text)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="phrases par client")
+    parser.add_argument("--batch", type=int, nargs="+", default=[16], help="tailles max de lot")
+    parser.add_argument("--wait", type=float, nargs="+", default=[5.0], help="attentes max (ms)")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--quality", nargs="+", default=None, help="modes de décodage (défaut : TRANSLATE_QUALITY)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # Charge le modèle via le registre du service puis construit des batchers dédiés
+    from micro_batcher import MicroBatcher
+    from decoding import parse_quality
+    from translator import marian_translate_batch, registry
+
+    loaded = registry.get(("fr", "en"))
+    qualities = [parse_quality(q) for q in args.quality or [None]]
+
+    configs = [(1, 0.0)] + [(b, w) for b in args.batch for w in args.wait]
+    marian_translate_batch(loaded.tokenizer, loaded.model, SENTENCES[:2])  # échauffement
+
+    print(f"{'quality':>8} {'clients':>7} {'max_batch':>9} {'wait ms':>8} {'phrases/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'lot moyen':>9}")
+    for quality in qualities:
+        def translate_batch(texts, quality=quality):
+            return marian_translate_batch(loaded.tokenizer, loaded.model, texts, quality)
+
+        for clients in args.clients:
+            for max_batch, wait in configs:
+                batcher = MicroBatcher(translate_batch, max_batch, wait, name=f"bench-{max_batch}-{wait}")
+                result = run(batcher, clients, args.requests)
+                avg = batcher.stats()["avgBatchSize"] or 0
+                print(f"{quality:>8} {clients:>7} {max_batch:>9} {wait:>8.1f} {result['throughput']:>10.2f} "
+                      f"{result['p50']:>9.1f} {result['p95']:>9.1f} {avg:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
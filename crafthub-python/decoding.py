@@ -0,0 +1,106 @@
+# decoding.py
+import math
+import os
+import threading
+from collections import deque
+
+# Paramètre `quality` : nombre de faisceaux du décodage (1 = greedy)
+QUALITY_MODES = {
+    "fast": 1,
+    "balanced": int(os.getenv("TRANSLATE_BALANCED_BEAMS", "2")),
+    "best": int(os.getenv("TRANSLATE_BEST_BEAMS", "4")),
+}
+
+# Budget de décodage : tokens d'entrée × ratio + marge, plafonné (ancien max_new_tokens fixe)
+LENGTH_RATIO = float(os.getenv("TRANSLATE_LENGTH_RATIO", "1.6"))
+LENGTH_MARGIN = int(os.getenv("TRANSLATE_LENGTH_MARGIN", "8"))
+MAX_NEW_TOKENS = int(os.getenv("TRANSLATE_MAX_NEW_TOKENS", "400"))
+
+DEFAULT_QUALITY = os.getenv("TRANSLATE_QUALITY", "best").strip().lower()
+
+# Classes de longueur des statistiques : titres, phrases, paragraphes
+LENGTH_CLASSES = [(16, "title"), (64, "sentence"), (float("inf"), "paragraph")]
+
+
+def parse_quality(value=None) -> str:
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"quality doit être une chaîne : {value!r}")
+    quality = (value or DEFAULT_QUALITY).strip().lower()
+    if quality not in QUALITY_MODES:
+        raise ValueError(f"quality inconnue : {value!r} (attendu : {', '.join(QUALITY_MODES)})")
+    return quality
+
+
+parse_quality(DEFAULT_QUALITY)  # TRANSLATE_QUALITY invalide : erreur dès le démarrage
+
+
+def max_new_tokens(input_tokens: int) -> int:
+    return min(MAX_NEW_TOKENS, math.ceil(input_tokens * LENGTH_RATIO) + LENGTH_MARGIN)
+
+
+def generation_kwargs(quality: str, input_tokens: int) -> dict:
+    """Arguments de generate() pour un lot dont l'entrée la plus longue fait `input_tokens` tokens."""
+    beams = QUALITY_MODES[quality]
+    kwargs = {"num_beams": beams, "do_sample": False, "max_new_tokens": max_new_tokens(input_tokens)}
+    if beams > 1:
+        # Arrêt dès que `beams` hypothèses complètes sont trouvées
+        kwargs["early_stopping"] = True
+    return kwargs
+
+
+def version_tag(quality: str) -> str:
+    """À ajouter aux versions de modèle : greedy et beam search ne partagent pas de cache."""
+    return f"+beam{QUALITY_MODES[quality]}"
+
+
+def length_class(input_tokens: int) -> str:
+    return next(name for limit, name in LENGTH_CLASSES if input_tokens <= limit)
+
+
+class DecodingStats:
+    """
+    Latence de generate() par mode et par classe de longueur (sur les
+    `window` derniers lots), pour choisir les modes par défaut des titres et
+    des descriptions. `capped` compte les lots arrêtés par le budget de
+    tokens : s'il monte, LENGTH_RATIO est trop bas.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def record(self, quality, input_tokens, segments, output_tokens, seconds, budget):
+        key = (quality, length_class(input_tokens))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = {
+                    "latencies": deque(maxlen=self.window), "batches": 0, "segments": 0, "seconds": 0.0,
+                    "inputTokens": 0, "outputTokens": 0, "capped": 0,
+                }
+            bucket["latencies"].append(seconds)
+            bucket["batches"] += 1
+            bucket["segments"] += segments
+            bucket["seconds"] += seconds
+            bucket["inputTokens"] += input_tokens
+            bucket["outputTokens"] += output_tokens
+            bucket["capped"] += output_tokens >= budget
+
+    def stats(self):
+        out = {}
+        with self._lock:
+            for (quality, klass), bucket in sorted(self._buckets.items()):
+                latencies = sorted(bucket["latencies"])
+                out.setdefault(quality, {})[klass] = {
+                    "beams": QUALITY_MODES[quality],
+                    "batches": bucket["batches"],
+                    "segments": bucket["segments"],
+                    "p50Ms": round(latencies[len(latencies) // 2] * 1000, 1),
+                    "p95Ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+                    "msPerSegment": round(bucket["seconds"] * 1000 / bucket["segments"], 1),
+                    # Tokens générés / tokens d'entrée (entrée la plus longue de chaque lot)
+                    "outputRatio": round(bucket["outputTokens"] / max(1, bucket["inputTokens"]), 2),
+                    "capped": bucket["capped"],
+                }
+        return out
@@ -0,0 +1,140 @@
+# glossary.py
+import hashlib
+import json
+import re
+
+# Mots et ponctuation : les expressions du glossaire et les textes sont découpés de la même façon
+TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# Marqueurs qui remplacent les termes épinglés avant le modèle (recopiés tels quels par Marian)
+PLACEHOLDER = "[{}]"
+PLACEHOLDER_RE = re.compile(r"\[\d+\]")
+_END = None  # Clé de fin d'expression dans le trie
+
+
+def token_key(token: str) -> str:
+    return token.replace("’", "'").replace("‘", "'").lower()
+
+
+class Glossary:
+    """
+    Glossaire d'une direction compilé en trie sur les tokens normalisés
+    (minuscules, apostrophes droites). Une seule passe de gauche à droite
+    trouve à chaque position l'expression connue la plus longue, ce qui
+    traduit d'un coup les termes de plusieurs mots ("terre cuite") avant les
+    mots isolés. Les entrées `pin=True` sont les termes métier que
+    `pin()` protège avant MarianMT.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self.entries = 0
+        self._pinned = []
+        self._fingerprint = None
+
+    def add(self, source: str, target: str, pin=False):
+        keys = [token_key(t) for t in TOKEN_RE.findall(source)]
+        if not keys:
+            return
+        node = self._root
+        for key in keys:
+            node = node.setdefault(key, {})
+        if _END not in node:
+            self.entries += 1
+        node[_END] = (target, pin)
+        if pin:
+            self._pinned.append((" ".join(keys), target))
+            self._fingerprint = None
+
+    def update(self, mapping, pin=False):
+        for source, target in mapping.items():
+            self.add(source, target, pin)
+        return self
+
+    def fingerprint(self) -> str:
+        """Empreinte des termes épinglés : change quand le glossaire change (clés de cache)."""
+        if self._fingerprint is None:
+            payload = json.dumps(sorted(self._pinned), ensure_ascii=False).encode("utf-8")
+            self._fingerprint = hashlib.sha1(payload).hexdigest()[:8]
+        return self._fingerprint
+
+    @property
+    def has_pinned(self) -> bool:
+        return bool(self._pinned)
+
+    def matches(self, text: str, pinned_only=False):
+        """(début, fin, traduction) des expressions trouvées, sans chevauchement, plus longue d'abord."""
+        tokens = list(TOKEN_RE.finditer(text or ""))
+        keys = [token_key(m.group()) for m in tokens]
+        i, n = 0, len(tokens)
+        while i < n:
+            node, best, j = self._root, None, i
+            while j < n:
+                node = node.get(keys[j])
+                if node is None:
+                    break
+                j += 1
+                entry = node.get(_END)
+                if entry is not None and (entry[1] or not pinned_only):
+                    best = (j, entry[0])
+            if best is None:
+                i += 1
+                continue
+            end, target = best
+            yield tokens[i].start(), tokens[end - 1].end(), target
+            i = end
+
+    def _replace(self, text, spans, replacement):
+        out, last = [], 0
+        for index, (start, end, target) in enumerate(spans):
+            out.append(text[last:start])
+            out.append(replacement(index, text[start:end], target))
+            last = end
+        out.append(text[last:])
+        return "".join(out)
+
+    def translate(self, text: str) -> str:
+        """Remplace chaque expression connue par sa traduction ; le reste du texte est recopié."""
+        def match_case(_, original, target):
+            # "Coussin" -> "Cushion" : la majuscule initiale du texte source est conservée
+            if original[:1].isupper() and target[:1].islower():
+                return target[:1].upper() + target[1:]
+            return target
+
+        return self._replace(text, list(self.matches(text)), match_case)
+
+    def pin(self, text: str):
+        """
+        Remplace les termes épinglés par des marqueurs [1], [2]… à envoyer au
+        modèle ; renvoie (texte masqué, traductions des termes).
+        """
+        if not self._pinned or PLACEHOLDER_RE.search(text):
+            return text, []
+        spans = list(self.matches(text, pinned_only=True))
+        return self._replace(text, spans, lambda index, *_: PLACEHOLDER.format(index + 1)), [t for _, _, t in spans]
+
+    @staticmethod
+    def unpin(translation: str, terms):
+        """Remet les termes à la place des marqueurs ; None si le modèle en a perdu ou dupliqué un."""
+        for index, term in enumerate(terms):
+            marker = PLACEHOLDER.format(index + 1)
+            if translation.count(marker) != 1:
+                return None
+            translation = translation.replace(marker, term)
+        return translation
+
+
+def load_glossaries(path, glossaries=None):
+    """
+    Charge un fichier JSON {"fr-en": {"terms": {...}, "words": {...}}, ...} :
+    `terms` (termes métier, épinglés avant le modèle) et `words` (fallback
+    seulement). Complète `glossaries` ({(source, cible): Glossary}) s'il est donné.
+    """
+    glossaries = {} if glossaries is None else glossaries
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for name, sections in data.items():
+        direction = tuple(name.lower().split("-", 1))
+        glossary = glossaries.setdefault(direction, Glossary())
+        glossary.update(sections.get("words", {}))
+        glossary.update(sections.get("terms", {}), pin=True)
+    return glossaries
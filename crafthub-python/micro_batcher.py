@@ -0,0 +1,104 @@
+# micro_batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes concurrentes d'une même direction de traduction :
+    le premier texte arrivé attend au plus `max_wait_ms` que d'autres le
+    rejoignent (jusqu'à `max_batch_size`), puis tout le lot passe dans un seul
+    appel à `translate_batch(texts) -> list[str]`. Un seul thread par batcher
+    appelle le modèle, chaque appelant récupère son propre résultat.
+    """
+
+    def __init__(self, translate_batch, max_batch_size=16, max_wait_ms=5.0, name="batcher"):
+        self.translate_batch = translate_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def translate(self, text: str, timeout=None) -> str:
+        return self.submit(text).result(timeout)
+
+    def translate_many(self, texts, timeout=None):
+        # Mis en file ensemble : ils partent dans le même lot (ou des lots consécutifs)
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout) for future in futures]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Ce qui est déjà en file part avec le lot même si le délai est écoulé
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            texts = [text for text, _ in pending]
+            try:
+                outputs = list(self.translate_batch(texts))
+                if len(outputs) != len(texts):
+                    # Sans correspondance un à un, aucun résultat n'est fiable : tout le lot échoue
+                    raise RuntimeError(f"{self.name} : {len(outputs)} traductions pour {len(texts)} textes")
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(pending, outputs):
+                future.set_result(output)
+            with self._lock:
+                self.batches += 1
+                self.items += len(texts)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avgBatchSize": round(self.items / self.batches, 2) if self.batches else None,
+                "maxBatchSize": self.max_batch_size,
+                "maxWaitMs": self.max_wait * 1000.0,
+            }
+
+
+def length_buckets(lengths, max_items=32, max_tokens=8192):
+    """
+    Découpe des textes triés par longueur (en tokens) en lots homogènes : chaque
+    lot est paddé à son plus long texte, trier évite de payer le padding d'un
+    long texte sur des textes courts. Un lot contient au plus `max_items`
+    textes et au plus `max_tokens` tokens une fois paddé. Renvoie des listes
+    d'indices dans `lengths`, des plus courts aux plus longs.
+    """
+    buckets, current = [], []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Trié : le texte courant est le plus long du lot s'il y entre
+        if current and (len(current) >= max_items or lengths[index] * (len(current) + 1) > max_tokens):
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
@@ -0,0 +1,170 @@
+# model_registry.py
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Paires servies par Marian : "source-cible:dépôt", séparées par des virgules
+DEFAULT_PAIRS = "fr-en:Helsinki-NLP/opus-mt-fr-en,en-fr:Helsinki-NLP/opus-mt-en-fr"
+
+
+def parse_pairs(spec: str) -> dict:
+    """'fr-en:Helsinki-NLP/opus-mt-fr-en,...' -> {('fr', 'en'): 'Helsinki-NLP/opus-mt-fr-en'}"""
+    pairs = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        direction, _, repo = item.partition(":")
+        source, _, target = direction.strip().partition("-")
+        if not source or not target or not repo.strip():
+            raise ValueError(f"Paire de traduction invalide : {item!r}")
+        pairs[(source.lower(), target.lower())] = repo.strip()
+    return pairs
+
+
+def hub_revision(repo):
+    """Commit du modèle dans le cache Hugging Face local, sans le charger (None si absent)."""
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        path = try_to_load_from_cache(repo, "config.json")
+    except Exception:
+        return None
+    if not isinstance(path, str) or "/snapshots/" not in path.replace(os.sep, "/"):
+        return None
+    return path.replace(os.sep, "/").split("/snapshots/")[1].split("/")[0]
+
+
+def model_size_bytes(mdl) -> int:
+    """
+    Taille des poids d'après le state_dict : compte aussi les poids int8
+    empaquetés (absents de parameters()), et une seule fois les poids partagés.
+    """
+    seen = set()
+
+    def size(value):
+        if isinstance(value, (tuple, list)):
+            return sum(size(v) for v in value)
+        if not hasattr(value, "numel") or not hasattr(value, "element_size"):
+            return 0
+        try:
+            key = value.data_ptr()
+        except Exception:
+            key = id(value)
+        if key in seen:
+            return 0
+        seen.add(key)
+        return value.numel() * value.element_size()
+
+    return sum(size(v) for v in mdl.state_dict().values())
+
+
+class LoadedModel:
+    def __init__(self, direction, repo, tokenizer, model, version, size_bytes, load_seconds):
+        self.direction = direction
+        self.repo = repo
+        self.tokenizer = tokenizer
+        self.model = model
+        self.version = version
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+
+
+class ModelRegistry:
+    """
+    Modèles de traduction chargés à la première utilisation d'une direction
+    (un seul chargement même sous requêtes concurrentes), gardés dans une LRU
+    bornée par un budget mémoire. Les chargements et évictions sont journalisés
+    et consultables via stats().
+    """
+
+    def __init__(self, pairs, loader, memory_budget_mb=1200.0, on_event=None, resolve_version=None,
+                 size_of=model_size_bytes):
+        self.pairs = dict(pairs)
+        self.loader = loader  # loader(direction, repo) -> (tokenizer, model, version)
+        self.resolve_version = resolve_version  # resolve_version(direction, repo) -> version sans charger, ou None
+        self.size_of = size_of
+        self.memory_budget = memory_budget_mb * 2 ** 20
+        self.on_event = on_event
+        self._lock = threading.Lock()
+        self._direction_locks = {direction: threading.Lock() for direction in self.pairs}
+        self._loaded = OrderedDict()
+        self._versions = {}
+        self.events = deque(maxlen=50)
+        self.loads = 0
+        self.evictions = 0
+
+    def supports(self, direction) -> bool:
+        return direction in self.pairs
+
+    def _event(self, kind, direction, **fields):
+        event = {"event": kind, "direction": "-".join(direction), "at": time.time(), **fields}
+        self.events.append(event)
+        if self.on_event:
+            self.on_event(event)
+
+    def get(self, direction) -> LoadedModel:
+        with self._lock:
+            loaded = self._loaded.get(direction)
+            if loaded is not None:
+                self._loaded.move_to_end(direction)
+                return loaded
+        if direction not in self.pairs:
+            raise KeyError(f"Direction non configurée : {direction}")
+        with self._direction_locks[direction]:
+            # Un autre thread a pu charger le modèle pendant l'attente
+            with self._lock:
+                loaded = self._loaded.get(direction)
+                if loaded is not None:
+                    self._loaded.move_to_end(direction)
+                    return loaded
+            repo = self.pairs[direction]
+            start = time.perf_counter()
+            tokenizer, model, version = self.loader(direction, repo)
+            loaded = LoadedModel(direction, repo, tokenizer, model, version, self.size_of(model),
+                                 time.perf_counter() - start)
+            with self._lock:
+                self._loaded[direction] = loaded
+                self._versions[direction] = version
+                self.loads += 1
+                evicted = self._evict(keep=direction)
+            self._event("load", direction, repo=repo, seconds=round(loaded.load_seconds, 2),
+                        sizeMb=round(loaded.size_bytes / 2 ** 20, 1))
+            for old in evicted:
+                self._event("evict", old.direction, repo=old.repo, sizeMb=round(old.size_bytes / 2 ** 20, 1))
+            return loaded
+
+    def _evict(self, keep):
+        evicted = []
+        while len(self._loaded) > 1 and sum(m.size_bytes for m in self._loaded.values()) > self.memory_budget:
+            direction = next(iter(self._loaded))
+            if direction == keep:
+                break
+            evicted.append(self._loaded.pop(direction))
+            self.evictions += 1
+        return evicted
+
+    def version(self, direction) -> str:
+        """Version du modèle (pour les clés de cache) ; charge le modèle si elle est encore inconnue."""
+        version = self._versions.get(direction)
+        if version is None and self.resolve_version is not None and direction in self.pairs:
+            version = self.resolve_version(direction, self.pairs[direction])
+            if version is not None:
+                self._versions[direction] = version
+        if version is None:
+            version = self.get(direction).version
+        return version
+
+    def stats(self):
+        with self._lock:
+            loaded = list(self._loaded.values())
+            return {
+                "pairs": {"-".join(d): repo for d, repo in self.pairs.items()},
+                "loaded": [{"direction": "-".join(m.direction), "sizeMb": round(m.size_bytes / 2 ** 20, 1),
+                            "loadSeconds": round(m.load_seconds, 2)} for m in loaded],
+                "memoryMb": round(sum(m.size_bytes for m in loaded) / 2 ** 20, 1),
+                "budgetMb": round(self.memory_budget / 2 ** 20, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "events": list(self.events),
+            }
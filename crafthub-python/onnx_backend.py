@@ -0,0 +1,65 @@
+# onnx_backend.py
+"""
+Backend ONNX Runtime pour MarianMT : encodeur et décodeur (avec KV-cache)
+exportés une fois via optimum, puis rechargés depuis le disque. Le modèle
+obtenu expose le même generate() que MarianMTModel (greedy ou beam search).
+
+Dépendances optionnelles : pip install "optimum[onnxruntime]"
+"""
+import os
+import shutil
+
+ONNX_DIR = os.getenv("TRANSLATION_ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"))
+
+
+def session_options():
+    """Pool de threads ORT : ORT_NUM_THREADS (intra-op, 0 = tous les cœurs), ORT_INTEROP_THREADS."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(os.getenv("ORT_NUM_THREADS", "0"))
+    options.inter_op_num_threads = int(os.getenv("ORT_INTEROP_THREADS", "1"))
+    # Décodage pas à pas : exécution séquentielle, graphe optimisé au chargement
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def export_dir(repo, revision=None):
+    name = repo.replace("/", "--") + (f"@{revision}" if revision else "")
+    return os.path.join(ONNX_DIR, name)
+
+
+def load_onnx_marian(repo, revision=None):
+    """Renvoie (tokenizer, modèle ORT) ; exporte vers ONNX_DIR au premier appel."""
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise RuntimeError('Backend ONNX indisponible : pip install "optimum[onnxruntime]"') from e
+    from transformers import MarianTokenizer
+
+    path = export_dir(repo, revision)
+    if not os.path.exists(os.path.join(path, "config.json")):
+        print(f"🛠️ Export ONNX de {repo} vers {path}")
+        # Export dans un dossier temporaire puis renommage : un autre worker ne voit jamais un export partiel
+        tmp = f"{path}.{os.getpid()}.tmp"
+        model = ORTModelForSeq2SeqLM.from_pretrained(repo, export=True, use_cache=True)
+        model.save_pretrained(tmp)
+        MarianTokenizer.from_pretrained(repo).save_pretrained(tmp)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # Déjà exporté par un autre worker
+    model = ORTModelForSeq2SeqLM.from_pretrained(path, use_cache=True, session_options=session_options())
+    return MarianTokenizer.from_pretrained(path), model
+
+
+def onnx_size_bytes(model) -> int:
+    directory = getattr(model, "model_save_dir", None)
+    if directory is None:
+        return 0
+    directory = str(getattr(directory, "name", directory))
+    return sum(
+        os.path.getsize(os.path.join(directory, f))
+        for f in os.listdir(directory) if f.endswith((".onnx", ".onnx_data"))
+    )
@@ -0,0 +1,64 @@
+# onnx_parity.py
+"""
+Vérifie que le backend ONNX Runtime traduit comme PyTorch : mêmes phrases du
+corpus local, décodage greedy puis beam search, comparaison exacte et BLEU.
+Code de sortie 1 si la parité n'est pas atteinte (utilisable en CI).
+
+    python onnx_parity.py --direction fr-en
+    python onnx_parity.py --direction en-fr --beams 1 4 --min-exact 0.9
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+from transformers import MarianMTModel, MarianTokenizer
+
+from benchmark_quantization import CORPUS, bleu
+from model_registry import DEFAULT_PAIRS, hub_revision, parse_pairs
+from onnx_backend import load_onnx_marian
+
+
+def generate(tok, mdl, texts, num_beams):
+    batch = tok(list(texts), return_tensors="pt", padding=True, truncation=True)
+    with torch.no_grad():
+        gen = mdl.generate(**batch, max_new_tokens=400, num_beams=num_beams)
+    return tok.batch_decode(gen, skip_special_tokens=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--direction", default="fr-en")
+    parser.add_argument("--beams", type=int, nargs="+", default=[1, 4], help="1 = greedy")
+    parser.add_argument("--min-exact", type=float, default=0.9, help="part minimale de sorties identiques")
+    parser.add_argument("--min-bleu", type=float, default=95.0, help="BLEU minimal contre PyTorch")
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    source, target = args.direction.lower().split("-", 1)
+    repo = parse_pairs(os.getenv("TRANSLATION_PAIRS", DEFAULT_PAIRS))[(source, target)]
+    with open(args.corpus, encoding="utf-8") as f:
+        texts = json.load(f)[f"translate_{source}_{target}"]
+
+    pt_tok = MarianTokenizer.from_pretrained(repo)
+    pt_model = MarianMTModel.from_pretrained(repo).eval()
+    ort_tok, ort_model = load_onnx_marian(repo, hub_revision(repo))
+
+    ok = True
+    for beams in args.beams:
+        expected = generate(pt_tok, pt_model, texts, beams)
+        actual = generate(ort_tok, ort_model, texts, beams)
+        exact = sum(a == e for a, e in zip(actual, expected)) / len(texts)
+        score = bleu(actual, expected)
+        passed = exact >= args.min_exact and score >= args.min_bleu
+        ok = ok and passed
+        print(f"{'✓' if passed else '✗'} beams={beams} identiques={exact:.0%} BLEU={score:.1f}")
+        for a, e in zip(actual, expected):
+            if a != e:
+                print(f"    torch : {e!r}\n    onnx  : {a!r}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
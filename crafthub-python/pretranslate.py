@@ -0,0 +1,246 @@
+# pretranslate.py
+"""
+Pré-traduction du catalogue en tâche de fond : parcourt db.products, repère
+les produits dont le nom ou la description a changé (empreinte du contenu)
+ou dont la traduction date d'un autre modèle, les traduit par gros lots avec
+les fonctions de translator.py et range le résultat dans
+db.product_translations. Le cache SQLite des segments est rempli au passage :
+les appels /ai/translate sur ces produits deviennent des lectures de cache.
+
+Pour ne jamais ralentir les requêtes interactives :
+  - priorité CPU réduite (PRETRANSLATE_NICE) et peu de threads (PRETRANSLATE_THREADS) ;
+  - chaque paquet attend que le serveur de traduction soit inactif depuis
+    --idle-seconds (compteurs de /ai/translate/stats) ;
+  - rapport cyclique : après un paquet de d secondes, pause de d × (1 - duty) / duty.
+
+    python pretranslate.py --once
+    python pretranslate.py --targets en fr --interval 600 --duty 0.3
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import traceback
+import urllib.request
+from datetime import datetime, timezone
+
+from pymongo import MongoClient, UpdateOne
+
+PRODUCTS = "products"
+TRANSLATIONS = "product_translations"
+SAME_LANGUAGE = "same-language"
+
+
+def load_translator(threads):
+    """Importe translator.py après avoir limité ses threads (fixés à l'import)."""
+    os.environ.setdefault("TORCH_NUM_THREADS", str(threads))
+    os.environ.setdefault("ORT_NUM_THREADS", str(threads))
+    import translator
+    return translator
+
+
+def content_hash(name, description):
+    return hashlib.sha1(f"{name}\0{description}".encode("utf-8")).hexdigest()
+
+
+def product_chunks(db, chunk_size):
+    """Produits (nom et description seulement) par paquets, dans l'ordre des _id."""
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        chunk = list(db[PRODUCTS].find(query, {"name": 1, "description": 1}).sort("_id", 1).limit(chunk_size))
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]["_id"]
+
+
+def stale_jobs(db, tr, products, targets, quality):
+    """Traductions absentes, ou dont le contenu ou la version du modèle a changé."""
+    keys = [f"{p['_id']}:{target}" for p in products for target in targets]
+    existing = {
+        doc["_id"]: doc
+        for doc in db[TRANSLATIONS].find({"_id": {"$in": keys}}, {"contentHash": 1, "modelVersion": 1})
+    }
+    jobs, unsupported = [], 0
+    for product in products:
+        name = (product.get("name") or "").strip()
+        description = (product.get("description") or "").strip()
+        if not name and not description:
+            continue
+        # Même détection que /ai/translate appelé sans source
+        source = tr.detect_lang(description or name)
+        digest = content_hash(name, description)
+        for target in targets:
+            if source == target:
+                version = SAME_LANGUAGE
+            elif tr.registry.supports((source, target)):
+                version = tr.cache_version((source, target), quality)
+            else:
+                unsupported += 1
+                continue
+            doc = existing.get(f"{product['_id']}:{target}")
+            if doc and doc.get("contentHash") == digest and doc.get("modelVersion") == version:
+                continue
+            jobs.append({
+                "productId": product["_id"], "source": source, "target": target,
+                "name": name, "description": description, "contentHash": digest, "modelVersion": version,
+            })
+    return jobs, unsupported
+
+
+def translate_jobs(tr, jobs, quality):
+    """Un passage par direction : textes dédupliqués, triés par longueur, cache consulté d'abord."""
+    texts = {}
+    for job in jobs:
+        if job["source"] != job["target"]:
+            direction = texts.setdefault((job["source"], job["target"]), {})
+            for text in (job["name"], job["description"]):
+                if text:
+                    direction[text] = None
+    translations = {}
+    for direction, unique in texts.items():
+        translations[direction] = dict(tr.translate_streamed(direction, list(unique), quality))
+    return translations
+
+
+def write_jobs(db, jobs, translations):
+    translated_at = datetime.now(timezone.utc)
+    operations = []
+    for job in jobs:
+        found = translations.get((job["source"], job["target"]), {})
+        fields = {key: job[key] for key in ("productId", "source", "target", "contentHash", "modelVersion")}
+        for field in ("name", "description"):
+            text = job[field]
+            fields[field] = text if job["modelVersion"] == SAME_LANGUAGE or not text else found[text]
+        fields["translatedAt"] = translated_at
+        operations.append(UpdateOne({"_id": f"{job['productId']}:{job['target']}"}, {"$set": fields}, upsert=True))
+    if operations:
+        db[TRANSLATIONS].bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+class IdleGate:
+    """
+    Attend que le serveur de traduction n'ait traité aucun segment depuis
+    `idle_seconds` (somme des compteurs des micro-batchers et des lots de
+    /ai/translate/batch). Serveur injoignable : considéré comme inactif.
+    """
+
+    def __init__(self, stats_url, idle_seconds=2.0):
+        self.stats_url = stats_url
+        self.idle_seconds = idle_seconds
+        self._served = None
+        self._changed_at = time.monotonic()
+        self._warned = False
+
+    def served(self):
+        try:
+            with urllib.request.urlopen(self.stats_url, timeout=2) as response:
+                stats = json.load(response)
+        except (OSError, ValueError) as e:
+            if not self._warned:
+                print(f"⚠️ Statistiques du serveur indisponibles ({e}) : pas d'attente d'inactivité")
+                self._warned = True
+            return None
+        self._warned = False
+        return sum(b["items"] for b in stats.get("batchers", {}).values()) + stats.get("bulk", {}).get("segments", 0)
+
+    def wait(self) -> float:
+        """Bloque jusqu'à l'inactivité du serveur ; renvoie le temps attendu."""
+        if not self.stats_url:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            served = self.served()
+            if served is None:
+                break
+            now = time.monotonic()
+            if served != self._served:
+                self._served, self._changed_at = served, now
+            idle_for = now - self._changed_at
+            if idle_for >= self.idle_seconds:
+                break
+            time.sleep(self.idle_seconds - idle_for)
+        return time.monotonic() - start
+
+
+def pretranslate(db, tr, targets, quality, chunk_size=32, gate=None, duty=0.5):
+    """Un passage complet sur le catalogue ; renvoie les compteurs du passage."""
+    totals = {"products": 0, "written": 0, "unsupported": 0, "idleWaitS": 0.0, "pauseS": 0.0}
+    start = time.perf_counter()
+    for products in product_chunks(db, chunk_size):
+        totals["products"] += len(products)
+        jobs, unsupported = stale_jobs(db, tr, products, targets, quality)
+        totals["unsupported"] += unsupported
+        if not jobs:
+            continue
+        if gate is not None:
+            totals["idleWaitS"] += gate.wait()
+        chunk_start = time.perf_counter()
+        translations = translate_jobs(tr, jobs, quality)
+        totals["written"] += write_jobs(db, jobs, translations)
+        # Rapport cyclique : le worker n'occupe le CPU qu'une fraction `duty` du temps
+        busy = time.perf_counter() - chunk_start
+        pause = busy * (1 - duty) / duty if 0 < duty < 1 else 0.0
+        totals["pauseS"] += pause
+        print(f"📝 {len(jobs)} traductions écrites en {busy:.1f}s (dernier produit {products[-1]['_id']})")
+        time.sleep(pause)
+    totals["seconds"] = round(time.perf_counter() - start, 1)
+    totals["idleWaitS"], totals["pauseS"] = round(totals["idleWaitS"], 1), round(totals["pauseS"], 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=os.getenv("PRETRANSLATE_TARGETS", "en").split(","),
+                        help="langues cibles")
+    parser.add_argument("--quality", default=None, help="mode de décodage (défaut : TRANSLATE_QUALITY)")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("PRETRANSLATE_CHUNK", "32")),
+                        help="produits par paquet")
+    parser.add_argument("--once", action="store_true", help="un seul passage puis arrêt")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("PRETRANSLATE_INTERVAL", "300")),
+                        help="secondes entre deux passages")
+    parser.add_argument("--duty", type=float, default=float(os.getenv("PRETRANSLATE_DUTY", "0.5")),
+                        help="fraction du temps passée à traduire (1 = sans pause)")
+    parser.add_argument("--idle-seconds", type=float, default=float(os.getenv("PRETRANSLATE_IDLE_SECONDS", "2")),
+                        help="inactivité du serveur exigée avant chaque paquet")
+    parser.add_argument("--server-stats", default=os.getenv("PRETRANSLATE_SERVER_STATS", "http://localhost:5010/ai/translate/stats"),
+                        help="URL des statistiques du serveur de traduction ('' : pas d'attente)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("PRETRANSLATE_THREADS", "2")),
+                        help="threads torch / ONNX Runtime du worker")
+    args = parser.parse_args()
+
+    # Priorité CPU plus basse que le serveur interactif
+    nice = int(os.getenv("PRETRANSLATE_NICE", "10"))
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    tr = load_translator(args.threads)
+    from decoding import parse_quality
+    quality = parse_quality(args.quality)
+    targets = [t.strip().lower() for t in args.targets if t.strip()]
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/craft_hub"))
+    db = client["craft_hub"]
+    db[TRANSLATIONS].create_index("productId")
+    gate = IdleGate(args.server_stats, args.idle_seconds)
+
+    print(f"🚀 Pré-traduction du catalogue vers {targets} (quality={quality}, duty={args.duty})")
+    while True:
+        try:
+            totals = pretranslate(db, tr, targets, quality, args.chunk_size, gate, args.duty)
+            print(f"✅ Passage terminé : {totals}")
+        except Exception:
+            if args.once:
+                raise
+            # Modèle ou base indisponible : nouvel essai au passage suivant
+            print("❌ ERREUR pendant la pré-traduction")
+            traceback.print_exc()
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
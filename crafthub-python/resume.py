@@ -7,6 +7,8 @@ from flask_limiter.util import get_remote_address
 import time
 import re
 
+from torch_runtime import QUANTIZE, configure_threads, maybe_quantize
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, filename='app.log')
 logger = logging.getLogger(__name__)
@@ -25,12 +27,17 @@ limiter = Limiter(
 
 limiter.init_app(app)
 
+# Threads PyTorch explicites (TORCH_NUM_THREADS / TORCH_INTEROP_THREADS)
+logger.info(f"Threads torch : {configure_threads()}")
+
 # Charger le modèle avec gestion d'erreur
 summarizer = None
 try:
     logger.info("Tentative de chargement du modèle distilbart-cnn-12-6...")
     summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", framework="pt")
-    logger.info("Modèle chargé avec succès.")
+    # TORCH_QUANTIZE=int8 : couches Linear quantifiées dynamiquement (CPU)
+    summarizer.model = maybe_quantize(summarizer.model)
+    logger.info(f"Modèle chargé avec succès ({QUANTIZE or 'fp32'}).")
 except Exception as e:
     logger.error(f"Échec du chargement du modèle : {e}")
     summarizer = None
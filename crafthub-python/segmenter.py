@@ -0,0 +1,104 @@
+# segmenter.py
+import re
+
+# Balises HTML/XML et entités : jamais envoyées au modèle, recopiées telles quelles
+MARKUP_RE = re.compile(r"<[^<>]+>|&[a-zA-Z]+;|&#\d+;")
+# Fin de phrase : ponctuation (+ guillemets/parenthèses fermants) suivie d'espaces
+SENTENCE_END_RE = re.compile(r"([.!?…]+[\"'»”)\]]*)(\s+)")
+# Mots après lesquels un point ne termine pas la phrase
+ABBREVIATIONS = {
+    "m", "mme", "mlle", "dr", "st", "ste", "etc", "env", "réf", "ref", "cf", "ex", "p", "n", "no", "vol",
+    "mr", "mrs", "ms", "vs", "approx", "e.g", "i.e", "cm", "mm", "kg", "g", "ml", "cl",
+}
+HAS_WORD_RE = re.compile(r"[^\W\d_]", re.UNICODE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _split_long(sentence, max_chars):
+    """Coupe une phrase trop longue sur ; , : puis sur les espaces, sans dépasser max_chars."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces, current = [], ""
+    for chunk in re.split(r"(?<=[;,:])(?=\s)", sentence):
+        if current and len(current) + len(chunk) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += chunk
+    pieces.append(current)
+    out = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            # Coupure au début de la dernière suite d'espaces (après ceux de tête) :
+            # les espaces passent en tête du morceau suivant
+            lead = len(piece) - len(piece.lstrip())
+            spaces = [m.start() for m in WHITESPACE_RE.finditer(piece, lead, max_chars)]
+            cut = spaces[-1] if spaces else max(max_chars, lead + 1)
+            out.append(piece[:cut])
+            piece = piece[cut:]
+        out.append(piece)
+    return out
+
+
+def _sentences(run):
+    """Découpe un bloc de texte sans balise en (phrase, espaces qui suivent)."""
+    out, start = [], 0
+    for m in SENTENCE_END_RE.finditer(run):
+        before = run[start:m.start(1)].rsplit(None, 1)
+        last_word = before[-1].lower().strip("(\"'«") if before else ""
+        if m.group(1) == "." and last_word in ABBREVIATIONS:
+            continue
+        out.append((run[start:m.end(1)], m.group(2)))
+        start = m.end()
+    if start < len(run):
+        out.append((run[start:], ""))
+    return out
+
+
+def segment(text: str, max_chars: int = 400):
+    """
+    Découpe `text` en segments à traduire. Renvoie (parts, segments) : parts
+    contient soit du texte littéral (espaces, balises, ponctuation seule),
+    soit l'indice du segment à insérer à cet endroit.
+    """
+    parts, segments = [], []
+
+    def literal(s):
+        if s:
+            parts.append(s)
+
+    def add_text(run):
+        for sentence, trailing in _sentences(run):
+            # Espaces de tête/fin conservés hors du segment
+            core = sentence.strip()
+            if not core:
+                literal(sentence + trailing)
+                continue
+            lead = sentence[:len(sentence) - len(sentence.lstrip())]
+            tail = sentence[len(sentence.rstrip()):]
+            literal(lead)
+            if core and HAS_WORD_RE.search(core):
+                for piece in _split_long(core, max_chars):
+                    # Les espaces de coupure restent entre les morceaux traduits
+                    stripped = piece.strip()
+                    if not HAS_WORD_RE.search(stripped):
+                        literal(piece)
+                        continue
+                    literal(piece[:len(piece) - len(piece.lstrip())])
+                    parts.append(len(segments))
+                    segments.append(stripped)
+                    literal(piece[len(piece.rstrip()):])
+            else:
+                literal(core)
+            literal(tail + trailing)
+
+    pos = 0
+    for m in MARKUP_RE.finditer(text):
+        add_text(text[pos:m.start()])
+        literal(m.group(0))
+        pos = m.end()
+    add_text(text[pos:])
+    return parts, segments
+
+
+def reassemble(parts, translations):
+    return "".join(translations[p] if isinstance(p, int) else p for p in parts)
@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+from segmenter import reassemble, segment
+
+ALPHABET = ["a", "é", "b", "1", " ", "  ", "\n", "\t", ".", ",", ";", "!", "?", "<b>", "</b>", "&amp;", "M.", "»"]
+
+
+def check(text, max_chars):
+    parts, segments = segment(text, max_chars)
+    assert reassemble(parts, segments) == text
+    for s in segments:
+        assert s and s == s.strip()
+        assert len(s) <= max_chars
+
+
+def test_whitespace_runs_at_the_cut():
+    check("a" * 397 + "  " + "b " * 100, 400)
+    check("a" * 10 + " " * 30 + "b" * 10, 8)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_text_reassembles(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice(ALPHABET) * rng.randint(1, 12) for _ in range(rng.randint(1, 60)))
+    check(text, rng.randint(1, 30))
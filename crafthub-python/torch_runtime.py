@@ -0,0 +1,47 @@
+# torch_runtime.py
+import os
+
+import torch
+
+# TORCH_QUANTIZE=int8 : quantification dynamique des couches Linear au chargement (CPU)
+QUANTIZE = os.getenv("TORCH_QUANTIZE", "").lower()
+
+
+def configure_threads():
+    """
+    Fixe explicitement les threads PyTorch : TORCH_NUM_THREADS (intra-op, calcul
+    d'une opération) et TORCH_INTEROP_THREADS (opérations en parallèle). À
+    appeler au démarrage, avant toute inférence.
+    """
+    threads = int(os.getenv("TORCH_NUM_THREADS", "0"))
+    interop = int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+    if threads > 0:
+        torch.set_num_threads(threads)
+    if interop > 0:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError as e:
+            # Impossible une fois qu'un travail parallèle a démarré
+            print(f"⚠️ TORCH_INTEROP_THREADS ignoré : {e}")
+    return {"threads": torch.get_num_threads(), "interopThreads": torch.get_num_interop_threads()}
+
+
+def quantize_int8(model):
+    """Poids des nn.Linear en int8, activations quantifiées à la volée (CPU uniquement)."""
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def maybe_quantize(model, mode=None):
+    mode = QUANTIZE if mode is None else mode
+    if mode == "int8":
+        return quantize_int8(model)
+    if mode:
+        raise ValueError(f"TORCH_QUANTIZE inconnu : {mode!r} (attendu : int8)")
+    return model
+
+
+def version_suffix(mode=None):
+    """À ajouter aux versions de modèle : les sorties int8 et fp32 ne partagent pas de cache."""
+    mode = QUANTIZE if mode is None else mode
+    return f"+{mode}" if mode else ""
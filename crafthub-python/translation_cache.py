@@ -0,0 +1,119 @@
+# translation_cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TranslationCache:
+    """
+    Cache à deux niveaux des traductions, clé = (direction, version du modèle,
+    texte normalisé) : une LRU bornée en mémoire devant une base SQLite qui
+    survit aux redémarrages et est partagée par les workers (mode WAL).
+    """
+
+    def __init__(self, path, max_entries=10000, normalize=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.normalize = normalize or (lambda t: t)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            db = self._db()
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " direction TEXT NOT NULL, model TEXT NOT NULL, source TEXT NOT NULL,"
+                " translation TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (direction, model, source)) WITHOUT ROWID"
+            )
+            db.commit()
+
+    def _db(self):
+        # Une connexion par thread (sqlite3 interdit le partage entre threads)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, direction, model, texts):
+        """Renvoie {texte: traduction} pour les textes déjà connus."""
+        found, missing = {}, {}
+        with self._lock:
+            for text in texts:
+                source = self.normalize(text)
+                key = (direction, model, source)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(source, []).append(text)
+        if missing and self.path:
+            sources = list(missing)
+            rows = []
+            try:
+                db = self._db()
+                for start in range(0, len(sources), 500):
+                    chunk = sources[start:start + 500]
+                    rows += db.execute(
+                        "SELECT source, translation FROM translations WHERE direction = ? AND model = ?"
+                        f" AND source IN ({','.join('?' * len(chunk))})",
+                        [direction, model, *chunk]
+                    ).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache SQLite indisponible: {e}")
+            with self._lock:
+                for source, translation in rows:
+                    self._remember((direction, model, source), translation)
+                    for text in missing.pop(source, []):
+                        found[text] = translation
+                        self.disk_hits += 1
+        with self._lock:
+            self.misses += sum(len(texts) for texts in missing.values())
+        return found
+
+    def put_many(self, direction, model, pairs):
+        rows = []
+        with self._lock:
+            for text, translation in pairs:
+                source = self.normalize(text)
+                self._remember((direction, model, source), translation)
+                rows.append((direction, model, source, translation, time.time()))
+            self.writes += len(rows)
+        if rows and self.path:
+            try:
+                db = self._db()
+                db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache SQLite indisponible: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": (self.memory_hits + self.disk_hits) / lookups if lookups else None,
+                "memoryEntries": len(self._memory),
+                "maxEntries": self.max_entries,
+                "writes": self.writes,
+            }
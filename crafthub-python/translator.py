@@ -1,13 +1,25 @@
 # translator.py
+import json
 import os
+import threading
+import time
 import traceback
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
 # --- Hugging Face MarianMT (FR<->EN) ---
 from transformers import MarianMTModel, MarianTokenizer
 import torch
 
+from glossary import Glossary, load_glossaries
+from decoding import DEFAULT_QUALITY, QUALITY_MODES, DecodingStats, generation_kwargs, parse_quality, version_tag
+from micro_batcher import MicroBatcher, length_buckets
+from model_registry import DEFAULT_PAIRS, ModelRegistry, hub_revision, model_size_bytes, parse_pairs
+from onnx_backend import load_onnx_marian, onnx_size_bytes
+from torch_runtime import configure_threads, maybe_quantize, version_suffix
+from segmenter import segment, reassemble
+from translation_cache import TranslationCache
+
 app = Flask(__name__)
 # Autorise ton front React local
 CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"]}})
@@ -60,96 +72,354 @@ TRANSLATIONS = {
     }
 }
 
+# Phrases FR -> EN connues (exemples de ton projet)
+PHRASE_TRANSLATIONS_FR_EN = {
+    "Fabriqué à partir de coton naturel ou de lin, ce coussin présente des motifs tressés ou brodés à la main. "
+    "Il apporte une touche bohème et chaleureuse au salon ou à la chambre. Résistant et lavable, il est pensé pour allier confort et esthétique.":
+    "Made from natural cotton or linen, this cushion features hand-woven or embroidered patterns. "
+    "It brings a bohemian and warm touch to the living room or bedroom. Durable and washable, it is designed to combine comfort and aesthetics.",
+
+    "Monté artisanalement sur un fil solide, ce collier met en valeur des pierres polies à la main. "
+    "Chaque pierre conserve ses irrégularités naturelles, rendant chaque bijou unique. "
+    "En plus de leur beauté, ces pierres sont associées à des vertus énergétiques et spirituelles.":
+    "Artisanally mounted on a strong thread, this necklace showcases hand-polished stones. "
+    "Each stone retains its natural irregularities, making each piece of jewelry unique. "
+    "In addition to their beauty, these stones are associated with energetic and spiritual virtues.",
+
+    "Chaque vase est façonné par un potier artisanal, puis émaillé et cuit au four traditionnel. "
+    "Sa forme élégante et son aspect unique en font une pièce décorative idéale, qu'il soit utilisé seul ou avec des fleurs séchées. "
+    "Disponible en différentes nuances naturelles (terre cuite, blanc cassé, bleu profond).":
+    "Each vase is shaped by an artisan potter, then glazed and fired in a traditional kiln. "
+    "Its elegant shape and unique appearance make it an ideal decorative piece, whether used alone or with dried flowers. "
+    "Available in different natural shades (terracotta, off-white, deep blue).",
+}
+
+# Mini glossaire (mot à mot) – très limité
+BASIC_FR_EN = {
+    "le": "the", "la": "the", "les": "the", "des": "some", "un": "a", "une": "a",
+    "et": "and", "est": "is", "avec": "with", "pour": "for", "de": "of", "du": "of the",
+    "au": "to the", "aux": "to the", "à": "to", "ça": "that", "sur": "on",
+    "ce": "this", "cette": "this", "ces": "these", "cet": "this",
+    "il": "it", "elle": "she", "nous": "we", "vous": "you", "ils": "they", "elles": "they",
+    "fabriqué": "made", "coton": "cotton", "naturel": "natural", "lin": "linen",
+    "coussin": "cushion", "motifs": "patterns", "tressés": "woven", "brodés": "embroidered",
+    "main": "hand", "apporte": "brings", "touche": "touch", "bohème": "bohemian",
+    "chaleureuse": "warm", "salon": "living room", "chambre": "bedroom",
+    "résistant": "durable", "lavable": "washable", "pensé": "designed",
+    "allier": "combine", "confort": "comfort", "esthétique": "aesthetics",
+    "bijou": "jewelry", "pierre": "stone", "polies": "polished", "fil": "thread",
+}
+
+# Glossaire métier supplémentaire (termes épinglés + mots), voir glossary.json
+TRANSLATION_GLOSSARY = os.getenv(
+    "TRANSLATION_GLOSSARY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "glossary.json")
+)
+
+def build_glossaries():
+    """Compile une fois les tables ci-dessus et le fichier de glossaire en un trie par direction."""
+    glossaries = {}
+    for source, targets in TRANSLATIONS.items():
+        for target, mapping in targets.items():
+            glossaries.setdefault((source, target), Glossary()).update(mapping)
+    glossaries.setdefault(("fr", "en"), Glossary()).update(PHRASE_TRANSLATIONS_FR_EN).update(BASIC_FR_EN)
+    if os.path.exists(TRANSLATION_GLOSSARY):
+        load_glossaries(TRANSLATION_GLOSSARY, glossaries)
+    print(f"📖 Glossaires : { {'-'.join(d): g.entries for d, g in glossaries.items()} }")
+    return glossaries
+
+glossaries = build_glossaries()
+
 def simple_translate(text: str, source: str, target: str) -> str:
     """
-    Fallback très simple :
-    1) correspondance exacte via TRANSLATIONS
-    2) quelques phrases FR connues -> EN
-    3) mini glossaire mot-à-mot (limité)
+    Fallback très simple : une seule passe sur le glossaire compilé de la
+    direction. Les phrases connues, puis les termes de plusieurs mots, puis
+    les mots isolés sont remplacés (expression la plus longue d'abord) ; le
+    reste du texte est recopié.
     """
-    txt = normalize_text(text)
-
-    # 1) Dico direct exact
-    if source in TRANSLATIONS and target in TRANSLATIONS[source]:
-        if txt in TRANSLATIONS[source][target]:
-            return TRANSLATIONS[source][target][txt]
-
-    # 2) Phrases FR -> EN (exemples de ton projet)
-    if source == "fr" and target == "en":
-        phrase_translations = {
-            normalize_text(
-                "Fabriqué à partir de coton naturel ou de lin, ce coussin présente des motifs tressés ou brodés à la main. "
-                "Il apporte une touche bohème et chaleureuse au salon ou à la chambre. Résistant et lavable, il est pensé pour allier confort et esthétique."
-            ):
-            "Made from natural cotton or linen, this cushion features hand-woven or embroidered patterns. "
-            "It brings a bohemian and warm touch to the living room or bedroom. Durable and washable, it is designed to combine comfort and aesthetics.",
-
-            normalize_text(
-                "Monté artisanalement sur un fil solide, ce collier met en valeur des pierres polies à la main. "
-                "Chaque pierre conserve ses irrégularités naturelles, rendant chaque bijou unique. "
-                "En plus de leur beauté, ces pierres sont associées à des vertus énergétiques et spirituelles."
-            ):
-            "Artisanally mounted on a strong thread, this necklace showcases hand-polished stones. "
-            "Each stone retains its natural irregularities, making each piece of jewelry unique. "
-            "In addition to their beauty, these stones are associated with energetic and spiritual virtues.",
-
-            normalize_text(
-                "Chaque vase est façonné par un potier artisanal, puis émaillé et cuit au four traditionnel. "
-                "Sa forme élégante et son aspect unique en font une pièce décorative idéale, qu'il soit utilisé seul ou avec des fleurs séchées. "
-                "Disponible en différentes nuances naturelles (terre cuite, blanc cassé, bleu profond)."
-            ):
-            "Each vase is shaped by an artisan potter, then glazed and fired in a traditional kiln. "
-            "Its elegant shape and unique appearance make it an ideal decorative piece, whether used alone or with dried flowers. "
-            "Available in different natural shades (terracotta, off-white, deep blue).",
-        }
+    glossary = glossaries.get((source, target))
+    if glossary is None:
+        return text
+    return glossary.translate(normalize_text(text))
 
-        key = normalize_text(txt)
-        if key in phrase_translations:
-            return phrase_translations[key]
-
-        # 3) Mini glossaire (mot à mot) – très limité
-        basic = {
-            "le": "the", "la": "the", "les": "the", "des": "some", "un": "a", "une": "a",
-            "et": "and", "est": "is", "avec": "with", "pour": "for", "de": "of", "du": "of the",
-            "au": "to the", "aux": "to the", "à": "to", "ça": "that", "sur": "on",
-            "ce": "this", "cette": "this", "ces": "these", "cet": "this",
-            "il": "it", "elle": "she", "nous": "we", "vous": "you", "ils": "they", "elles": "they",
-            "fabriqué": "made", "coton": "cotton", "naturel": "natural", "lin": "linen",
-            "coussin": "cushion", "motifs": "patterns", "tressés": "woven", "brodés": "embroidered",
-            "main": "hand", "apporte": "brings", "touche": "touch", "bohème": "bohemian",
-            "chaleureuse": "warm", "salon": "living room", "chambre": "bedroom",
-            "résistant": "durable", "lavable": "washable", "pensé": "designed",
-            "allier": "combine", "confort": "comfort", "esthétique": "aesthetics",
-            "bijou": "jewelry", "pierre": "stone", "polies": "polished", "fil": "thread",
-        }
-        out = []
-        for w in txt.split():
-            cw = w.strip('.,;:!?()"\'').lower()
-            out.append(basic.get(cw, w))
-        return " ".join(out)
+# Modèles Marian chargés à la demande, par direction (TRANSLATION_PAIRS),
+# dans la limite de TRANSLATION_MEMORY_MB (les moins récemment utilisés sont libérés).
+# Conseil : lance d’abord warmup_download.py pour mettre en cache les modèles.
+# Threads PyTorch (TORCH_NUM_THREADS / TORCH_INTEROP_THREADS) fixés avant tout chargement
+print(f"🧵 Threads torch : {configure_threads()}")
 
-    # Par défaut : renvoyer le texte
-    return text
+# Backend par direction : TRANSLATION_ONNX="fr-en,en-fr" fait passer ces directions par ONNX Runtime
+ONNX_DIRECTIONS = {
+    tuple(d.strip().lower().split("-", 1)) for d in os.getenv("TRANSLATION_ONNX", "").split(",") if "-" in d
+}
 
-# Charger les modèles Marian une fois (au démarrage)
-# Conseil : lance d’abord warmup_download.py pour mettre en cache les modèles.
-tok_fr_en = MarianTokenizer.from_pretrained("Helsinki-NLP/opus-mt-fr-en")
-mdl_fr_en = MarianMTModel.from_pretrained("Helsinki-NLP/opus-mt-fr-en")
+def backend_suffix(direction):
+    return "+onnx" if direction in ONNX_DIRECTIONS else version_suffix()
+
+def load_marian(direction, repo):
+    # Version du modèle (dépôt + commit + backend) : une mise à jour invalide naturellement le cache
+    if direction in ONNX_DIRECTIONS:
+        revision = hub_revision(repo)
+        tok, mdl = load_onnx_marian(repo, revision)
+        return tok, mdl, f"{repo}@{revision or 'local'}{backend_suffix(direction)}"
+    tok = MarianTokenizer.from_pretrained(repo)
+    mdl = MarianMTModel.from_pretrained(repo)
+    mdl.eval()
+    # TORCH_QUANTIZE=int8 : couches Linear quantifiées dynamiquement (CPU)
+    mdl = maybe_quantize(mdl)
+    return tok, mdl, f"{repo}@{getattr(mdl.config, '_commit_hash', None) or 'local'}{backend_suffix(direction)}"
+
+def cached_model_version(direction, repo):
+    """Même version que load_marian, sans charger le modèle."""
+    revision = hub_revision(repo)
+    return f"{repo}@{revision}{backend_suffix(direction)}" if revision else None
+
+def model_bytes(mdl):
+    # Modèle ORT : taille des fichiers .onnx ; PyTorch : taille des poids
+    return model_size_bytes(mdl) if hasattr(mdl, "state_dict") else onnx_size_bytes(mdl)
 
-tok_en_fr = MarianTokenizer.from_pretrained("Helsinki-NLP/opus-mt-en-fr")
-mdl_en_fr = MarianMTModel.from_pretrained("Helsinki-NLP/opus-mt-en-fr")
+def log_model_event(event):
+    icon = "📦" if event["event"] == "load" else "🗑️"
+    print(f"{icon} Modèle {event['event']} {event['direction']} ({event.get('sizeMb')} Mo)")
+
+registry = ModelRegistry(
+    parse_pairs(os.getenv("TRANSLATION_PAIRS", DEFAULT_PAIRS)),
+    load_marian,
+    memory_budget_mb=float(os.getenv("TRANSLATION_MEMORY_MB", "1200")),
+    on_event=log_model_event,
+    resolve_version=cached_model_version,
+    size_of=model_bytes,
+)
+
+# Directions servies par le petit dictionnaire quand aucun modèle n'est configuré
+FALLBACK_DIRECTIONS = [("fr", "ar"), ("ar", "fr")]
+
+# Latence de generate() par mode de décodage et longueur d'entrée (/ai/translate/stats)
+decoding_stats = DecodingStats()
+
+def marian_translate_batch(tok, mdl, texts, quality=DEFAULT_QUALITY):
+    """
+    Traduit plusieurs textes en un seul generate() (padding au plus long du lot).
+    Le budget max_new_tokens suit la longueur de l'entrée la plus longue ;
+    `quality` choisit greedy, petit ou grand beam search.
+    """
+    batch = tok(list(texts), return_tensors="pt", padding=True, truncation=True)
+    input_tokens = int(batch["attention_mask"].sum(dim=1).max())
+    kwargs = generation_kwargs(quality, input_tokens)
+    start = time.perf_counter()
+    with torch.no_grad():
+        gen = mdl.generate(**batch, **kwargs)
+    # gen commence par le token de départ du décodeur
+    decoding_stats.record(quality, input_tokens, len(texts), gen.shape[1] - 1,
+                          time.perf_counter() - start, kwargs["max_new_tokens"])
+    return tok.batch_decode(gen, skip_special_tokens=True)
+
+# TRANSLATION_GLOSSARY_PIN=1 : les termes métier ("terms" du glossaire) sont remplacés par des
+# marqueurs avant MarianMT puis réinjectés tels quels dans la traduction
+GLOSSARY_PIN = os.getenv("TRANSLATION_GLOSSARY_PIN", "0") == "1"
+pin_retries = 0
+
+def pinned_glossary(direction):
+    glossary = glossaries.get(direction) if GLOSSARY_PIN else None
+    return glossary if glossary is not None and glossary.has_pinned else None
+
+def model_translate(direction, tok, mdl, texts, quality=DEFAULT_QUALITY):
+    """marian_translate_batch avec, si activé, les termes du glossaire épinglés."""
+    global pin_retries
+    glossary = pinned_glossary(direction)
+    if glossary is None:
+        return marian_translate_batch(tok, mdl, texts, quality)
+    masked = [glossary.pin(text) for text in texts]
+    outputs = marian_translate_batch(tok, mdl, [m for m, _ in masked], quality)
+    results = [glossary.unpin(out, terms) for out, (_, terms) in zip(outputs, masked)]
+    lost = [i for i, result in enumerate(results) if result is None]
+    if lost:
+        # Marqueur perdu ou dupliqué par le modèle : ces segments sont retraduits sans épinglage
+        pin_retries += len(lost)
+        for i, out in zip(lost, marian_translate_batch(tok, mdl, [texts[i] for i in lost], quality)):
+            results[i] = out
+    return results
+
+def translate_batch(direction, texts, quality=DEFAULT_QUALITY):
+    loaded = registry.get(direction)
+    return model_translate(direction, loaded.tokenizer, loaded.model, texts, quality)
+
+def cache_version(direction, quality):
+    # Greedy et beam search ne donnent pas les mêmes sorties : versions de cache distinctes
+    version = registry.version(direction) + version_tag(quality)
+    glossary = pinned_glossary(direction)
+    # Un glossaire modifié invalide les traductions épinglées
+    return version + f"+gloss{glossary.fingerprint()}" if glossary else version
+
+# Cache des segments traduits : LRU en mémoire + SQLite partagé entre workers
+translation_cache = TranslationCache(
+    os.getenv("TRANSLATION_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.sqlite3")),
+    max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", "10000")),
+    normalize=normalize_text,
+)
+
+# Micro-batching : les requêtes simultanées d'une même direction et d'un même mode partagent un generate()
+TRANSLATE_MAX_BATCH = int(os.getenv("TRANSLATE_MAX_BATCH", "16"))
+TRANSLATE_MAX_WAIT_MS = float(os.getenv("TRANSLATE_MAX_WAIT_MS", "5"))
+
+batchers = {
+    (direction, quality): MicroBatcher(
+        lambda texts, direction=direction, quality=quality: translate_batch(direction, texts, quality),
+        TRANSLATE_MAX_BATCH, TRANSLATE_MAX_WAIT_MS, name=f"{'-'.join(direction)}/{quality}")
+    for direction in registry.pairs for quality in QUALITY_MODES
+}
+
+# Longueur max d'un segment (en caractères) : reste loin de la limite de 512 tokens de Marian
+TRANSLATE_SEGMENT_CHARS = int(os.getenv("TRANSLATE_SEGMENT_CHARS", "400"))
+
+def translate_segmented(direction, text: str, quality=DEFAULT_QUALITY) -> str:
+    """
+    Traduit phrase par phrase : plus de troncature des longues descriptions,
+    et tous les segments d'une requête partent dans le même lot. Espaces et
+    balises sont recopiés tels quels autour des segments traduits. Seuls les
+    segments absents du cache passent par le modèle.
+    """
+    parts, segments = segment(text or "", TRANSLATE_SEGMENT_CHARS)
+    if not segments:
+        return text or ""
+    direction_key, version = "-".join(direction), cache_version(direction, quality)
+    known = translation_cache.get_many(direction_key, version, segments)
+    missing = list(dict.fromkeys(s for s in segments if s not in known))
+    if missing:
+        translated = batchers[(direction, quality)].translate_many(missing)
+        translation_cache.put_many(direction_key, version, zip(missing, translated))
+        known.update(zip(missing, translated))
+    return reassemble(parts, [known[s] for s in segments])
+
+# Traduction en masse (/ai/translate/batch) : lots triés par longueur, hors micro-batcher
+TRANSLATE_BULK_MAX_ITEMS = int(os.getenv("TRANSLATE_BULK_MAX_ITEMS", "5000"))
+TRANSLATE_BULK_BATCH = int(os.getenv("TRANSLATE_BULK_BATCH", "32"))
+TRANSLATE_BULK_TOKENS = int(os.getenv("TRANSLATE_BULK_TOKENS", "8192"))
+
+bulk_lock = threading.Lock()
+bulk_stats = {"requests": 0, "items": 0, "uniqueTexts": 0, "batches": 0, "segments": 0, "tokens": 0, "paddedTokens": 0}
+
+def translate_streamed(direction, texts, quality=DEFAULT_QUALITY):
+    """
+    Traduit des textes distincts d'une même direction et renvoie (texte,
+    traduction) dès que tous les segments du texte sont connus : d'abord ceux
+    entièrement en cache, puis au fil des lots. Les segments manquants sont
+    dédupliqués, triés par nombre de tokens et découpés en lots homogènes.
+    """
+    planned = {text: segment(text, TRANSLATE_SEGMENT_CHARS) for text in texts}
+    direction_key, version = "-".join(direction), cache_version(direction, quality)
+    unique = list(dict.fromkeys(s for _, segments in planned.values() for s in segments))
+    known = translation_cache.get_many(direction_key, version, unique)
+
+    def finish(text):
+        parts, segments = planned[text]
+        return text, reassemble(parts, [known[s] for s in segments]) if segments else text
+
+    # Pour chaque segment manquant, les textes qui l'attendent ; pour chaque texte, le nombre de segments manquants
+    waiting, owners = {}, {}
+    for text, (_, segments) in planned.items():
+        missing = set(s for s in segments if s not in known)
+        if not missing:
+            yield finish(text)
+            continue
+        waiting[text] = len(missing)
+        for s in missing:
+            owners.setdefault(s, []).append(text)
+    if not owners:
+        return
+
+    missing = list(owners)
+    loaded = registry.get(direction)
+    lengths = [len(ids) for ids in loaded.tokenizer(missing, add_special_tokens=False)["input_ids"]]
+    for bucket in length_buckets(lengths, TRANSLATE_BULK_BATCH, TRANSLATE_BULK_TOKENS):
+        batch = [missing[i] for i in bucket]
+        translated = model_translate(direction, loaded.tokenizer, loaded.model, batch, quality)
+        translation_cache.put_many(direction_key, version, zip(batch, translated))
+        known.update(zip(batch, translated))
+        with bulk_lock:
+            bulk_stats["batches"] += 1
+            bulk_stats["segments"] += len(batch)
+            bulk_stats["tokens"] += sum(lengths[i] for i in bucket)
+            bulk_stats["paddedTokens"] += max(lengths[i] for i in bucket) * len(bucket)
+        for s in batch:
+            for text in owners[s]:
+                waiting[text] -= 1
+                if not waiting[text]:
+                    yield finish(text)
+
+def ndjson(payload) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+def stream_bulk(items, quality=DEFAULT_QUALITY):
+    """
+    Une ligne NDJSON par élément, dans l'ordre où les traductions aboutissent
+    (pas dans l'ordre de la requête), puis une ligne finale {"done": true}.
+    Même langue, fallback dictionnaire et erreurs de validation sortent
+    immédiatement ; les textes identiques d'une direction ne sont traduits
+    qu'une fois. `quality` s'applique aux éléments qui n'ont pas la leur.
+    """
+    groups = {}  # (direction, quality) -> {texte: [champs de réponse de chaque élément]}
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        # La position est toujours renvoyée ; "id" seulement si le client l'a fourni
+        key = {"index": index, "id": item["id"]} if "id" in item else {"index": index}
+        invalid = [f for f in ("text", "target", "source") if item.get(f) is not None and not isinstance(item[f], str)]
+        if invalid:
+            yield ndjson({**key, "error": f"Field '{invalid[0]}' must be a string"})
+            continue
+        text = (item.get("text") or "").strip()
+        target = (item.get("target") or "").lower()
+        source = (item.get("source") or "").lower()
+        if not text or not target:
+            yield ndjson({**key, "error": "Fields 'text' and 'target' are required"})
+            continue
+        try:
+            item_quality = quality if item.get("quality") in (None, "") else parse_quality(item["quality"])
+        except ValueError:
+            yield ndjson({**key, "error": f"Field 'quality' must be one of {', '.join(QUALITY_MODES)}"})
+            continue
+        source = source or detect_lang(text)
+        base = {**key, "source": source, "target": target}
+        if source == target:
+            yield ndjson({**base, "translation": text, "note": "Same language"})
+        elif registry.supports((source, target)):
+            base["quality"] = item_quality
+            groups.setdefault(((source, target), item_quality), {}).setdefault(text, []).append(base)
+        elif (source, target) in FALLBACK_DIRECTIONS:
+            yield ndjson({**base, "translation": simple_translate(text, source, target)})
+        else:
+            yield ndjson({**base, "error": f"Translation from {source} to {target} not supported yet"})
+
+    with bulk_lock:
+        bulk_stats["requests"] += 1
+        bulk_stats["items"] += len(items)
+        bulk_stats["uniqueTexts"] += sum(len(texts) for texts in groups.values())
+
+    for (direction, item_quality), texts in groups.items():
+        try:
+            for text, translation in translate_streamed(direction, list(texts), item_quality):
+                for base in texts.pop(text):
+                    yield ndjson({**base, "translation": translation})
+        except Exception:
+            print(f"❌ ERREUR /ai/translate/batch {'-'.join(direction)}")
+            traceback.print_exc()
+            # Les éléments déjà envoyés restent valides ; seuls les restants sont en erreur
+            for bases in texts.values():
+                for base in bases:
+                    yield ndjson({**base, "error": "Internal error during translation"})
+    yield ndjson({"done": True, "count": len(items)})
+
+def bulk_snapshot():
+    with bulk_lock:
+        stats = dict(bulk_stats)
+    # Part des tokens utiles dans les lots paddés (1.0 = aucun padding)
+    stats["paddingEfficiency"] = round(stats["tokens"] / stats["paddedTokens"], 3) if stats["paddedTokens"] else None
+    return stats
 
 def translate_fr_en(text: str) -> str:
-    text = text or ""
-    batch = tok_fr_en([text], return_tensors="pt", truncation=True)
-    gen = mdl_fr_en.generate(**batch, max_new_tokens=400)
-    return tok_fr_en.decode(gen[0], skip_special_tokens=True)
+    return translate_segmented(("fr", "en"), text)
 
 def translate_en_fr(text: str) -> str:
-    text = text or ""
-    batch = tok_en_fr([text], return_tensors="pt", truncation=True)
-    gen = mdl_en_fr.generate(**batch, max_new_tokens=400)
-    return tok_en_fr.decode(gen[0], skip_special_tokens=True)
+    return translate_segmented(("en", "fr"), text)
 
 # =========================
 #           API
@@ -171,6 +441,12 @@ def translate():
         if not text or not target:
             return jsonify({"error": "Fields 'text' and 'target' are required"}), 400
 
+        # fast = greedy, balanced = petit beam, best = beam complet (TRANSLATE_QUALITY par défaut)
+        try:
+            quality = parse_quality(data.get("quality"))
+        except ValueError:
+            return jsonify({"error": f"Field 'quality' must be one of {', '.join(QUALITY_MODES)}"}), 400
+
         # Détection auto si source non fournie
         if not source:
             source = detect_lang(text)
@@ -184,19 +460,15 @@ def translate():
                 "note": "Same language"
             }), 200
 
-        # Paires supportées
-        supported_directions = [("fr", "en"), ("en", "fr"), ("fr", "ar"), ("ar", "fr")]
-        if (source, target) not in supported_directions:
-            return jsonify({"error": f"Translation from {source} to {target} not supported yet"}), 400
-
-        # Choix du moteur
-        if (source, target) == ("fr", "en"):
-            translation = translate_fr_en(text)
-        elif (source, target) == ("en", "fr"):
-            translation = translate_en_fr(text)
-        else:
-            # FR<->AR et autres directions simples : fallback
+        # Choix du moteur : modèle Marian configuré, sinon fallback dictionnaire
+        if registry.supports((source, target)):
+            translation = translate_segmented((source, target), text, quality)
+            print(f"🎯 Traduction finale ({quality}): '{translation}'")
+            return jsonify({"translation": translation, "source": source, "target": target, "quality": quality}), 200
+        elif (source, target) in FALLBACK_DIRECTIONS:
             translation = simple_translate(text, source, target)
+        else:
+            return jsonify({"error": f"Translation from {source} to {target} not supported yet"}), 400
 
         print(f"🎯 Traduction finale: '{translation}'")
         return jsonify({"translation": translation, "source": source, "target": target}), 200
@@ -206,7 +478,46 @@ def translate():
         traceback.print_exc()
         return jsonify({"error": "Internal error during translation"}), 500
 
+@app.route("/ai/translate/batch", methods=["POST", "OPTIONS"])
+def translate_bulk():
+    """
+    Corps : {"items": [{"id"?, "text", "source"?, "target", "quality"?}, ...],
+    "quality"?} (ou la liste seule). Réponse en application/x-ndjson, chaque ligne envoyée dès que le
+    lot qui la contient est traduit, avec la position de l'élément ("index") et son "id" s'il en a un.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Field 'items' must be a non-empty list"}), 400
+    if len(items) > TRANSLATE_BULK_MAX_ITEMS:
+        return jsonify({"error": f"At most {TRANSLATE_BULK_MAX_ITEMS} items per request"}), 400
+    try:
+        quality = parse_quality(data.get("quality") if isinstance(data, dict) else None)
+    except ValueError:
+        return jsonify({"error": f"Field 'quality' must be one of {', '.join(QUALITY_MODES)}"}), 400
+    print(f"REQ batch items={len(items)}")
+    # X-Accel-Buffering : un proxy nginx ne doit pas retenir les lignes jusqu'à la fin
+    return Response(stream_bulk(items, quality), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+@app.route("/ai/translate/stats", methods=["GET"])
+def translate_stats():
+    return jsonify({
+        "batchers": {f"{s}-{t}/{quality}": b.stats() for ((s, t), quality), b in batchers.items()},
+        "cache": translation_cache.stats(),
+        "models": registry.stats(),
+        "bulk": bulk_snapshot(),
+        "decoding": decoding_stats.stats(),
+        "glossary": {
+            "entries": {"-".join(d): g.entries for d, g in glossaries.items()},
+            "pinning": GLOSSARY_PIN,
+            "pinRetries": pin_retries,
+        },
+    }), 200
+
 if __name__ == "__main__":
     # IMPORTANT : pas de reloader ni debug pour éviter double-chargement des modèles
     print("🚀 Serveur de traduction sur http://localhost:5010/ai/translate")
-    app.run(host="0.0.0.0", port=5010, debug=False, use_reloader=False)
+    # threaded=True : les requêtes concurrentes doivent pouvoir se retrouver dans le même lot
+    app.run(host="0.0.0.0", port=5010, debug=False, use_reloader=False, threaded=True)
@@ -1,11 +1,13 @@
+import os
+
 from huggingface_hub import snapshot_download
-for repo in [
-    "Helsinki-NLP/opus-mt-fr-en",
-    # ajoute ces lignes plus tard si tu veux d’autres paires :
-    # "Helsinki-NLP/opus-mt-en-fr",
-    # "Helsinki-NLP/opus-mt-fr-ar",
-]:
+
+from model_registry import DEFAULT_PAIRS, parse_pairs
+
+# Mêmes paires que le service de traduction (TRANSLATION_PAIRS), ex. pour ajouter fr-ar :
+# TRANSLATION_PAIRS="fr-en:Helsinki-NLP/opus-mt-fr-en,en-fr:Helsinki-NLP/opus-mt-en-fr,fr-ar:Helsinki-NLP/opus-mt-fr-ar"
+for repo in parse_pairs(os.getenv("TRANSLATION_PAIRS", DEFAULT_PAIRS)).values():
     print("↓ Téléchargement:", repo)
     snapshot_download(repo_id=repo)
     print("✓ OK:", repo)
-print("✅ Téléchargements terminés.")
\ No newline at end of file
+print("✅ Téléchargements terminés.")
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def _solve_rows(target, fixed, matrix, start, end, gram, regularization, alpha, cg_steps):
+    """
+    Conjugate-gradient update of target[start:end] with `fixed` held constant
+    (Hu, Koren & Volinsky implicit ALS). Confidence is 1 + alpha * count.
+    All rows of the chunk advance together through stacked numpy / sparse
+    products, so the work runs in compiled loops with the GIL released and
+    the thread pool actually scales across cores.
+    """
+    reg = regularization
+    indptr = matrix.indptr[start:end + 1]
+    lo, hi = indptr[0], indptr[-1]
+    rows, nnz = end - start, hi - lo
+    X = target[start:end]
+    if nnz == 0:
+        X[:] = 0
+        return
+    Y = fixed[matrix.indices[lo:hi]]                      # (nnz, k): factors of each interaction
+    weight = (alpha * matrix.data[lo:hi]).astype(np.float32)  # conf - 1
+    owner = np.repeat(np.arange(rows), np.diff(indptr))   # chunk row of each interaction
+    # Sums per-interaction rows into their chunk row
+    gather = sp.csr_matrix((np.ones(nnz, dtype=np.float32), np.arange(nnz), indptr - lo), shape=(rows, nnz))
+
+    def apply(P):
+        # A P  with  A = YtY + Yu^T (C-1) Yu + reg I, one row per user/item
+        dots = np.einsum('nk,nk->n', Y, P[owner])
+        return P @ gram + gather @ (Y * (weight * dots)[:, None]) + reg * P
+
+    # r = b - A x  with  b = Yu^T C p
+    R = gather @ (Y * (1.0 + weight)[:, None]) - apply(X)
+    P = R.copy()
+    rs_old = np.einsum('rk,rk->r', R, R)
+    for _ in range(cg_steps):
+        # Converged rows are frozen: zero step, same residual
+        active = rs_old >= 1e-10
+        if not active.any():
+            break
+        AP = apply(P)
+        curvature = np.einsum('rk,rk->r', P, AP)
+        step = np.where(active, rs_old / np.where(active, curvature, 1.0), 0.0).astype(np.float32)
+        X += step[:, None] * P
+        R -= step[:, None] * AP
+        rs_new = np.einsum('rk,rk->r', R, R)
+        beta = np.where(active, rs_new / np.where(active, rs_old, 1.0), 0.0).astype(np.float32)
+        P = R + beta[:, None] * P
+        rs_old = np.where(active, rs_new, rs_old)
+    X[np.diff(indptr) == 0] = 0
+
+
+def _half_step(pool, target, fixed, matrix, regularization, alpha, cg_steps, chunk):
+    gram = fixed.T @ fixed
+    futures = [
+        pool.submit(_solve_rows, target, fixed, matrix, start, min(start + chunk, matrix.shape[0]),
+                    gram, regularization, alpha, cg_steps)
+        for start in range(0, matrix.shape[0], chunk)
+    ]
+    for future in futures:
+        future.result()
+
+
+# Fit user/item factors with implicit-feedback ALS (confidence-weighted, CG solver)
+def fit_als(matrix, n_components=32, regularization=0.1, alpha=40.0, iterations=15, cg_steps=3,
+            threads=None, seed=42):
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    transposed = matrix.T.tocsr()
+    n_users, n_items = matrix.shape
+    rng = np.random.default_rng(seed)
+    user_factors = (rng.standard_normal((n_users, n_components)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, n_components)) * 0.01).astype(np.float32)
+
+    threads = threads or os.cpu_count() or 1
+    chunk = max(64, max(n_users, n_items) // (threads * 4) + 1)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(iterations):
+            _half_step(pool, user_factors, item_factors, matrix, regularization, alpha, cg_steps, chunk)
+            _half_step(pool, item_factors, user_factors, transposed, regularization, alpha, cg_steps, chunk)
+    return user_factors, item_factors
+
+
+# Exact ALS solve for one user not seen at training time
+def als_fold_in(item_factors, cols, values, regularization=0.1, alpha=40.0):
+    Y = item_factors[cols]
+    conf = 1.0 + alpha * np.asarray(values, dtype=np.float32)
+    A = item_factors.T @ item_factors + Y.T @ ((conf - 1.0)[:, None] * Y)
+    A += regularization * np.eye(item_factors.shape[1], dtype=np.float32)
+    return np.linalg.solve(A, Y.T @ conf).astype(np.float32)
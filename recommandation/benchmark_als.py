@@ -0,0 +1,83 @@
+"""
+Compare the SVD and ALS engines on synthetic payments: fit time and
+recall@k of the /recommend scoring path (neighbour purchases, purchased
+items masked) on each user's held-out last payment.
+
+    python benchmark_als.py --users 5000 --products 1000 --k 10
+    python benchmark_als.py --users 50000 --components 32 --scaling 1 2 4 8
+
+--scaling also times the ALS fit for each thread count (default: powers of
+two up to the CPU count) and reports the speedup over one thread.
+"""
+import argparse
+import os
+import time
+
+from als import fit_als
+from item_index import ItemNeighborIndex
+from model_manager import ENGINES, FactorModel
+from synthetic_data import build_snapshot, generate, split_last_payment
+
+
+def recall_at_k(model, snapshot, test, k):
+    truth = {}
+    for payment in test:
+        truth.setdefault(str(payment['userId']), set()).update(str(item['_id']) for item in payment['items'])
+    user_ids = list(truth)
+    hits = total = 0
+    for start in range(0, len(user_ids), 512):
+        chunk = user_ids[start:start + 512]
+        for user_id, recommended in zip(chunk, model.recommend_many(chunk, snapshot, n=k)):
+            relevant = truth[user_id]
+            hits += len(relevant.intersection(recommended or []))
+            total += min(len(relevant), k)
+    return hits / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--components', type=int, nargs='+', default=[2, 16, 32])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--als-iterations', type=int, default=15)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scaling', type=int, nargs='*', default=None,
+                        help='ALS thread counts to compare (no value: 1, 2, 4, ... up to the CPU count)')
+    args = parser.parse_args()
+
+    data = generate(args.users, args.products, seed=args.seed)
+    train, test = split_last_payment(data['payments'])
+    snapshot = build_snapshot(train)
+    print(f"{len(train)} train payments, {len(test)} held out, matrix {snapshot.matrix.shape}, nnz {snapshot.matrix.nnz}")
+    item_index = ItemNeighborIndex.build(snapshot.baskets)
+
+    print(f"{'engine':<6} {'factors':>7} {'fit (s)':>9} {'recall@' + str(args.k):>10}")
+    for engine in ENGINES:
+        for n_components in args.components:
+            options = {'iterations': args.als_iterations, 'threads': args.threads} if engine == 'als' else {}
+            start = time.perf_counter()
+            user_factors, item_factors = ENGINES[engine](snapshot.matrix, n_components=n_components, **options)
+            fit_seconds = time.perf_counter() - start
+            model = FactorModel(1, snapshot, user_factors, item_factors, item_index, fit_seconds, engine=engine)
+            recall = recall_at_k(model, snapshot, test, args.k)
+            print(f"{engine:<6} {n_components:>7} {fit_seconds:>9.3f} {recall:>10.4f}")
+
+    if args.scaling is not None:
+        cpus = os.cpu_count() or 1
+        counts = args.scaling or [t for t in (2 ** i for i in range(cpus.bit_length())) if t <= cpus]
+        n_components = max(args.components)
+        print(f"\nALS scaling ({n_components} factors, {args.als_iterations} iterations, {cpus} CPUs)")
+        print(f"{'threads':>7} {'fit (s)':>9} {'speedup':>8}")
+        baseline = None
+        for threads in counts:
+            start = time.perf_counter()
+            fit_als(snapshot.matrix, n_components=n_components, iterations=args.als_iterations, threads=threads)
+            fit_seconds = time.perf_counter() - start
+            baseline = baseline or fit_seconds
+            print(f"{threads:>7} {fit_seconds:>9.3f} {baseline / fit_seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
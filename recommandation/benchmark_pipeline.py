@@ -0,0 +1,231 @@
+"""
+Benchmark the recommendation pipeline on synthetic data at several scales:
+payments load into the sparse matrix (InteractionStore.load), factor fit,
+item co-purchase index, neighbour index, then the per-request path of
+/recommend (user vector, similar users, scoring) and the batch scorer.
+
+Payments are served from an in-memory stand-in for db.payments, so the load
+stage measures ingestion and matrix building, not BSON decoding or network.
+One-shot stages are repeated --repeats times; per-request stages run once per
+sampled user. Peak RSS is sampled while each stage runs.
+
+    python benchmark_pipeline.py --users 1000 10000 100000
+    python benchmark_pipeline.py --users 10000 --engine als --output baseline.json
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from interaction_store import InteractionStore
+from item_index import ItemNeighborIndex
+from model_manager import ENGINES, FactorModel
+from synthetic_data import generate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class MemoryCollection:
+    """The subset of a pymongo collection InteractionStore uses: find by _id range, sort, limit."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query=None, projection=None):
+        docs = self.docs
+        bounds = (query or {}).get('_id', {})
+        if '$gt' in bounds:
+            docs = [d for d in docs if d['_id'] > bounds['$gt']]
+        if '$lte' in bounds:
+            docs = [d for d in docs if d['_id'] <= bounds['$lte']]
+        return _Cursor(docs)
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+
+class MemoryDB:
+    def __init__(self, payments):
+        self.payments = MemoryCollection(payments)
+
+
+def _rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak so far, in KiB on Linux
+
+
+class PeakRSS:
+    """
+    Samples the resident set size in a background thread while the block
+    runs. `added` is the peak increase over the RSS at entry, i.e. what the
+    block itself needed; `peak` is the absolute process RSS, which also
+    carries everything earlier stages left allocated.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, _rss())
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self.baseline = self.peak = _rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+    @property
+    def added(self):
+        return self.peak - self.baseline
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self.peaks = {}
+        self.added = {}
+
+    def run(self, stage, fn, repeats=1):
+        result = None
+        with PeakRSS() as rss:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = fn()
+                self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        self.peaks[stage] = max(self.peaks.get(stage, 0), rss.peak)
+        self.added[stage] = max(self.added.get(stage, 0), rss.added)
+        return result
+
+    def summary(self):
+        rows = []
+        for stage, samples in self.samples.items():
+            ms = np.asarray(samples) * 1000
+            rows.append({
+                'stage': stage, 'runs': len(ms),
+                'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+                'p99_ms': float(np.percentile(ms, 99)), 'peak_rss_mb': self.peaks[stage] / 2 ** 20,
+                'rss_added_mb': self.added[stage] / 2 ** 20,
+            })
+        return rows
+
+
+def bench_scale(n_users, args):
+    n_products = max(100, int(n_users * args.products_per_user))
+    data = generate(n_users, n_products, payments_per_user=args.payments_per_user,
+                    popularity_exponent=args.popularity_exponent, seed=args.seed)
+    payments = data['payments']
+    db = MemoryDB(payments)
+    timer = StageTimer()
+
+    store = InteractionStore(db)
+    timer.run('interaction_load', store.load, args.repeats)
+    snapshot = store.snapshot
+
+    options = {'threads': args.threads} if args.engine == 'als' else {}
+    fit = ENGINES[args.engine]
+    user_factors, item_factors = timer.run(
+        f'{args.engine}_fit', lambda: fit(snapshot.matrix, n_components=args.components, **options), args.repeats
+    )
+    item_index = timer.run('item_index_build', lambda: ItemNeighborIndex.build(snapshot.baskets), args.repeats)
+    model = timer.run(
+        'neighbor_index_build',
+        lambda: FactorModel(1, snapshot, user_factors, item_factors, item_index, 0.0, args.index, engine=args.engine),
+        args.repeats
+    )
+
+    rng = np.random.default_rng(args.seed)
+    user_ids = snapshot.user_ids[:snapshot.matrix.shape[0]]
+    sample = [user_ids[i] for i in rng.choice(len(user_ids), min(args.queries, len(user_ids)), replace=False)]
+    matrix = model.snapshot.matrix
+    for user_id in sample:
+        vector = timer.run('user_vector', lambda: model.user_vector(user_id, snapshot))
+        neighbours = timer.run('similarity', lambda: model.similar_users(user_id, vector, k=5))
+        timer.run('scoring', lambda: np.argsort(-np.asarray(matrix[neighbours].sum(axis=0)).ravel(), kind='stable')[:5])
+    for start in range(0, len(sample), args.batch_size):
+        chunk = sample[start:start + args.batch_size]
+        timer.run('recommend_many', lambda: model.recommend_many(chunk, snapshot, n=5))
+
+    return {
+        'users': n_users, 'products': n_products, 'payments': len(payments),
+        'interactions': int(snapshot.matrix.nnz), 'engine': args.engine, 'stages': timer.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--products-per-user', type=float, default=0.1)
+    parser.add_argument('--payments-per-user', type=float, default=3.0)
+    parser.add_argument('--popularity-exponent', type=float, default=1.1)
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='svd')
+    parser.add_argument('--components', type=int, default=2)
+    parser.add_argument('--index', choices=['exact', 'lsh'], default='exact')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--repeats', type=int, default=3, help='runs of each one-shot stage')
+    parser.add_argument('--queries', type=int, default=500, help='sampled users for the per-request stages')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for n_users in args.users:
+        result = bench_scale(n_users, args)
+        results.append(result)
+        print(f"\n{result['users']} users, {result['products']} products, {result['payments']} payments, "
+              f"{result['interactions']} interactions ({result['engine']})")
+        print(f"{'stage':<22} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak RSS MB':>12} {'stage +MB':>10}")
+        for row in result['stages']:
+            print(f"{row['stage']:<22} {row['runs']:>5} {row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f} "
+                  f"{row['p99_ms']:>10.3f} {row['peak_rss_mb']:>12.1f} {row['rss_added_mb']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
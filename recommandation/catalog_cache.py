@@ -0,0 +1,149 @@
+import threading
+import time
+
+from bson.objectid import ObjectId
+
+from metrics import metrics
+from structured_logging import get_logger
+
+log = get_logger('catalog_cache')
+
+# Product documents as sent to clients: image blobs are dropped by Mongo, not in Python
+PRODUCT_PROJECTION = {'images.data': 0}
+
+
+class CatalogCache:
+    """
+    In-memory product categories, per-category lists of in-stock products and
+    per-user category affinities, used by the cold-start path. Refreshed from
+    Mongo when the TTL expires, and invalidated explicitly on new payments
+    (user profiles, stock of the purchased products) or through invalidate().
+    """
+
+    def __init__(self, db, store, ttl=300.0, per_category=20):
+        self.db = db
+        self.store = store
+        self.ttl = ttl
+        self.per_category = per_category
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._loaded_at = 0.0
+        self._product_categories = {}   # product id -> category
+        self._category_products = {}    # category -> [in-stock product documents]
+        self._profiles = {}             # user id -> [categories by affinity]
+        store.add_listener(self._on_payments)
+
+    # Full reload: one light query for categories/stock, one for the cached documents
+    def refresh(self):
+        product_categories, in_stock = {}, {}
+        with metrics.timed('mongo_catalog'):
+            products = list(self.db.products.find({}, {'category': 1, 'stock': 1}))
+        for product in products:
+            pid, category = str(product['_id']), product.get('category')
+            if not category or category == "null":
+                continue
+            product_categories[pid] = category
+            ids = in_stock.setdefault(category, [])
+            if (product.get('stock') or 0) > 0 and len(ids) < self.per_category:
+                ids.append(product['_id'])
+
+        wanted = [oid for ids in in_stock.values() for oid in ids]
+        documents = {}
+        if wanted:
+            with metrics.timed('mongo_catalog'):
+                found = list(self.db.products.find({'_id': {'$in': wanted}}, PRODUCT_PROJECTION))
+            for product in found:
+                documents[product['_id']] = product
+        category_products = {
+            category: [documents[oid] for oid in ids if oid in documents] for category, ids in in_stock.items()
+        }
+
+        with self._lock:
+            self._product_categories = product_categories
+            self._category_products = category_products
+            self._profiles = {}
+            self._loaded_at = time.time()
+        log.info("catalog_cache_refreshed", products=len(product_categories), categories=len(category_products))
+
+    def _ensure_fresh(self):
+        if time.time() - self._loaded_at < self.ttl:
+            return
+        # Une seule requête recharge le cache, les autres servent l'ancienne version
+        if self._refreshing.acquire(blocking=self._loaded_at == 0.0):
+            try:
+                if time.time() - self._loaded_at >= self.ttl:
+                    self.refresh()
+            finally:
+                self._refreshing.release()
+
+    def invalidate(self, product_ids=None):
+        if product_ids:
+            self._refresh_stock(product_ids)
+        else:
+            self._loaded_at = 0.0
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._profiles.pop(user_id, None)
+
+    def _refresh_stock(self, product_ids):
+        oids = [ObjectId(pid) for pid in product_ids if ObjectId.is_valid(pid)]
+        if not oids:
+            return
+        changed = list(self.db.products.find({'_id': {'$in': oids}}, PRODUCT_PROJECTION))
+        with self._lock:
+            category_products = {c: list(docs) for c, docs in self._category_products.items()}
+            for product in changed:
+                pid, category = str(product['_id']), product.get('category')
+                for docs in category_products.values():
+                    docs[:] = [doc for doc in docs if str(doc.get('_id')) != pid]
+                if not category or category == "null":
+                    self._product_categories.pop(pid, None)
+                    continue
+                self._product_categories[pid] = category
+                docs = category_products.setdefault(category, [])
+                if (product.get('stock') or 0) > 0 and len(docs) < self.per_category:
+                    docs.append(product)
+            self._category_products = category_products
+
+    def _on_payments(self, user_ids, product_ids):
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+        self._refresh_stock(product_ids)
+
+    def product_category(self, product_id):
+        self._ensure_fresh()
+        return self._product_categories.get(product_id)
+
+    # Categories of the user's purchases, most purchased first
+    def user_categories(self, user_id):
+        self._ensure_fresh()
+        profile = self._profiles.get(user_id)
+        if profile is not None:
+            return profile
+        snapshot = self.store.snapshot
+        row = snapshot.user_row(user_id)
+        counts = {}
+        if row is not None:
+            start, end = snapshot.matrix.indptr[row], snapshot.matrix.indptr[row + 1]
+            for col, value in zip(snapshot.matrix.indices[start:end], snapshot.matrix.data[start:end]):
+                category = self._product_categories.get(snapshot.product_ids[col])
+                if category:
+                    counts[category] = counts.get(category, 0) + value
+        profile = sorted(counts, key=lambda c: -counts[c])
+        with self._lock:
+            self._profiles[user_id] = profile
+        return profile
+
+    # Serialized in-stock products of the given categories, in category order
+    def products_by_category(self, categories, limit=5):
+        self._ensure_fresh()
+        products, seen = [], set()
+        for category in categories:
+            for doc in self._category_products.get(category, []):
+                if doc.get('_id') not in seen:
+                    seen.add(doc.get('_id'))
+                    products.append(doc)
+                    if len(products) >= limit:
+                        return products
+        return products
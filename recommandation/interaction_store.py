@@ -0,0 +1,303 @@
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from bson.objectid import ObjectId
+
+from metrics import metrics
+from structured_logging import get_logger
+
+log = get_logger('interaction_store')
+
+
+def _id_key(value):
+    # Ids are interned as ObjectId; hex strings from requests map to the same key
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def payment_time(payment_id):
+    # Seconds since the epoch, taken from the first four bytes of the ObjectId
+    if isinstance(payment_id, ObjectId):
+        return float(int.from_bytes(payment_id.binary[:4], 'big'))
+    return time.time()
+
+
+class IdInterner:
+    """
+    Maps raw ids (ObjectId) to dense integer codes. Codes are only ever
+    appended, so a snapshot can share the interner and simply ignore codes
+    beyond its own matrix shape.
+    """
+
+    def __init__(self, ids=()):
+        self.ids = list(ids)
+        self.codes = {_id_key(value): code for code, value in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, value):
+        key = _id_key(value)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.ids)
+            self.ids.append(str(key))
+            self.codes[key] = code
+        return code
+
+    def get(self, value, limit):
+        code = self.codes.get(_id_key(value))
+        return code if code is not None and code < limit else None
+
+
+class _CodeBuffer:
+    """Preallocated int32 columns, grown by doubling when full."""
+
+    def __init__(self, capacity, columns=3):
+        self.size = 0
+        self.data = np.empty((columns, max(capacity, 1024)), dtype=np.int32)
+
+    def append(self, *values):
+        if self.size == self.data.shape[1]:
+            grown = np.empty((self.data.shape[0], self.data.shape[1] * 2), dtype=np.int32)
+            grown[:, :self.size] = self.data[:, :self.size]
+            self.data = grown
+        self.data[:, self.size] = values
+        self.size += 1
+
+    def column(self, i):
+        return self.data[i, :self.size]
+
+
+class InteractionSnapshot:
+    """Immutable view of the user-product matrix, safe to read without locking."""
+
+    def __init__(self, matrix, users, products, version, interactions=0, baskets=None, last_payment_id=None):
+        # users x products, value = number of times the user bought the product
+        self.matrix = matrix
+        # payments x products, one row per payment's items array
+        self.baskets = baskets if baskets is not None else sp.csr_matrix((0, matrix.shape[1]), dtype=np.float32)
+        self._users = users
+        self._products = products
+        self.version = version
+        # Total number of purchase rows ingested so far, up to this payment _id
+        self.interactions = interactions
+        self.last_payment_id = last_payment_id
+
+    @property
+    def empty(self):
+        return self.matrix.nnz == 0
+
+    @property
+    def user_ids(self):
+        return self._users.ids
+
+    @property
+    def product_ids(self):
+        return self._products.ids
+
+    def user_row(self, user_id):
+        return self._users.get(user_id, self.matrix.shape[0])
+
+    def product_col(self, product_id):
+        return self._products.get(product_id, self.matrix.shape[1])
+
+    def purchased_products(self, user_id):
+        row = self.user_row(user_id)
+        if row is None:
+            return []
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return [self.product_ids[col] for col in self.matrix.indices[start:end]]
+
+
+# Rebuild a snapshot from the (memory-mapped) arrays written by snapshots.save_snapshot
+def snapshot_from_arrays(meta, arrays):
+    matrix = sp.csr_matrix(
+        (arrays['matrix_data'], arrays['matrix_indices'], arrays['matrix_indptr']), shape=tuple(meta['shape'])
+    )
+    baskets = sp.csr_matrix(
+        (arrays['baskets_data'], arrays['baskets_indices'], arrays['baskets_indptr']), shape=tuple(meta['basketsShape'])
+    )
+    return InteractionSnapshot(
+        matrix, IdInterner(arrays['user_ids']), IdInterner(arrays['product_ids']), 1, meta['interactions'], baskets
+    )
+
+
+class InteractionStore:
+    """
+    Long-lived sparse user-product matrix built from db.payments.
+    Loaded once at startup, then updated by polling payments newer than the
+    last seen _id. Readers only ever touch the current snapshot.
+    """
+
+    def __init__(self, db, poll_interval=30.0, batch_size=5000):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_id = None
+        self._users = IdInterner()
+        self._products = IdInterner()
+        self._listeners = []
+        self._interaction_listeners = []
+        self.snapshot = self._empty_snapshot()
+
+    def _empty_snapshot(self):
+        return InteractionSnapshot(sp.csr_matrix((0, 0), dtype=np.float32), self._users, self._products, 0)
+
+    # fn(user_ids, product_ids) is called after new payments have been applied
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    # fn(product_ids, timestamps) gets every new purchase row with its payment time.
+    # Returns the last payment _id already applied, so the caller can backfill up to it.
+    def add_interaction_listener(self, fn):
+        with self._lock:
+            self._interaction_listeners.append(fn)
+            return self._last_id
+
+    # Stream payments in batches, interning ids straight into int32 code arrays
+    def _fetch(self, query, capacity=0):
+        cursor = self.db.payments.find(query, {'userId': 1, 'items._id': 1}).sort('_id', 1).batch_size(self.batch_size)
+        buffer = _CodeBuffer(capacity)
+        n_baskets = 0
+        times = []  # payment time of each basket, from its ObjectId
+        for payment in cursor:
+            user_id = payment.get('userId')
+            if user_id is None:
+                continue
+            basket = None
+            for item in payment.get('items') or []:
+                product_id = item.get('_id') if isinstance(item, dict) else None
+                if product_id is None:
+                    continue
+                if basket is None:
+                    basket, n_baskets = n_baskets, n_baskets + 1
+                    times.append(payment_time(payment.get('_id')))
+                buffer.append(self._users.intern(user_id), self._products.intern(product_id), basket)
+        return buffer, n_baskets, np.asarray(times, dtype=np.float64)
+
+    def _apply(self, buffer, n_baskets, last_payment_id):
+        rows, cols, basket_rows = buffer.column(0), buffer.column(1), buffer.column(2)
+        shape = (len(self._users), len(self._products))
+        old = self.snapshot.matrix
+        # Pad the existing CSR with empty rows/columns for the new ids
+        indptr = np.concatenate([old.indptr, np.full(shape[0] - old.shape[0], old.indptr[-1], dtype=old.indptr.dtype)])
+        padded = sp.csr_matrix((old.data, old.indices, indptr), shape=shape)
+        # Duplicate (user, product) pairs are summed: the value is a purchase count
+        delta = sp.csr_matrix((np.ones(buffer.size, dtype=np.float32), (rows, cols)), shape=shape)
+        merged = (padded + delta).tocsr()
+
+        old_baskets = self.snapshot.baskets
+        new_baskets = sp.csr_matrix(
+            (np.ones(buffer.size, dtype=np.float32), (basket_rows, cols)), shape=(n_baskets, shape[1])
+        )
+        new_baskets.data[:] = 1.0  # Same product twice in one basket counts once
+        baskets = sp.vstack([
+            sp.csr_matrix((old_baskets.data, old_baskets.indices, old_baskets.indptr),
+                          shape=(old_baskets.shape[0], shape[1])),
+            new_baskets
+        ], format='csr')
+
+        self.snapshot = InteractionSnapshot(
+            merged, self._users, self._products,
+            self.snapshot.version + 1, self.snapshot.interactions + buffer.size, baskets, last_payment_id
+        )
+
+    def _last_payment_id(self, query):
+        last = list(self.db.payments.find(query, {'_id': 1}).sort('_id', -1).limit(1))
+        return last[0]['_id'] if last else self._last_id
+
+    # Full load, replaces any existing state
+    def load(self):
+        with self._lock:
+            self._last_id = None
+            self._users, self._products = IdInterner(), IdInterner()
+            self.snapshot = self._empty_snapshot()
+            last_id = self._last_payment_id({})
+            query = {"_id": {"$lte": last_id}} if last_id is not None else {}
+            with metrics.timed('interaction_load'):
+                buffer, n_baskets, times = self._fetch(query, capacity=2 * self.db.payments.estimated_document_count())
+            with metrics.timed('matrix_build'):
+                self._apply(buffer, n_baskets, last_id)
+            self._last_id = last_id
+        log.info("interaction_store_loaded", rows=buffer.size, shape=list(self.snapshot.matrix.shape))
+        self._notify_interactions(buffer, times)
+        return buffer.size
+
+    # Start from a saved snapshot (see snapshots.py) instead of scanning all payments;
+    # reuses the snapshot ModelManager.load_snapshot already built from the same arrays
+    def restore(self, meta, arrays, snapshot=None):
+        with self._lock:
+            restored = snapshot if snapshot is not None else snapshot_from_arrays(meta, arrays)
+            self._users, self._products = restored._users, restored._products
+            last_id = meta.get('lastPaymentId')
+            self._last_id = ObjectId(last_id) if last_id else None
+            restored.last_payment_id = self._last_id
+            self.snapshot = restored
+            log.info("interaction_store_restored", version=meta['version'], shape=list(restored.matrix.shape))
+
+    # Apply payments created since the last load/poll
+    def poll(self):
+        with self._lock:
+            query = {"_id": {"$gt": self._last_id}} if self._last_id is not None else {}
+            last_id = self._last_payment_id(query)
+            if last_id is None or last_id == self._last_id:
+                return 0
+            query = dict(query)
+            query["_id"] = dict(query.get("_id", {}), **{"$lte": last_id})
+            with metrics.timed('interaction_load'):
+                buffer, n_baskets, times = self._fetch(query)
+            if buffer.size:
+                with metrics.timed('matrix_build'):
+                    self._apply(buffer, n_baskets, last_id)
+            self._last_id = last_id
+        if buffer.size:
+            log.info("interaction_store_updated", rows=buffer.size, shape=list(self.snapshot.matrix.shape))
+            user_ids = {self._users.ids[code] for code in np.unique(buffer.column(0))}
+            product_ids = {self._products.ids[code] for code in np.unique(buffer.column(1))}
+            for listener in self._listeners:
+                try:
+                    listener(user_ids, product_ids)
+                except Exception as e:
+                    log.error("interaction_listener_failed", error=str(e), exc_info=True)
+            self._notify_interactions(buffer, times)
+        return buffer.size
+
+    def _notify_interactions(self, buffer, times):
+        if not self._interaction_listeners or not buffer.size:
+            return
+        product_ids = [self._products.ids[code] for code in buffer.column(1)]
+        timestamps = times[buffer.column(2)]
+        for listener in self._interaction_listeners:
+            try:
+                listener(product_ids, timestamps)
+            except Exception as e:
+                log.error("interaction_listener_failed", error=str(e), exc_info=True)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                log.error("payments_poll_failed", error=str(e), exc_info=True)
+
+    def start(self):
+        if self.snapshot.empty:
+            self.load()
+        else:
+            self.poll()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="interaction-store", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class ItemNeighborIndex:
+    """
+    Truncated item-to-item co-purchase similarity. For every product the k
+    most similar products (cosine over payment baskets) are kept in two dense
+    arrays, so a lookup is O(k) and no similarity matrix is held in memory.
+    """
+
+    def __init__(self, neighbors, scores):
+        self.neighbors = neighbors  # (n_products, k) int32, -1 for padding
+        self.scores = scores        # (n_products, k) float32, descending
+
+    @classmethod
+    def build(cls, baskets, k=20):
+        n_products = baskets.shape[1]
+        neighbors = np.full((n_products, k), -1, dtype=np.int32)
+        scores = np.zeros((n_products, k), dtype=np.float32)
+        if baskets.nnz == 0 or k == 0:
+            return cls(neighbors, scores)
+
+        binary = baskets.copy()
+        binary.data[:] = 1.0
+        counts = np.asarray(binary.sum(axis=0)).ravel()
+        co = (binary.T @ binary).tocsr()
+        co.setdiag(0)
+        co.eliminate_zeros()
+
+        norms = np.sqrt(counts)
+        norms[norms == 0] = 1.0
+        for item in range(n_products):
+            start, end = co.indptr[item], co.indptr[item + 1]
+            if start == end:
+                continue
+            cols = co.indices[start:end]
+            sims = co.data[start:end] / (norms[item] * norms[cols])
+            if len(sims) > k:
+                part = np.argpartition(-sims, k - 1)[:k]
+                cols, sims = cols[part], sims[part]
+            order = np.argsort(-sims, kind='stable')
+            neighbors[item, :len(order)] = cols[order]
+            scores[item, :len(order)] = sims[order]
+        return cls(neighbors, scores)
+
+    def similar(self, item, n=None):
+        row = self.neighbors[item]
+        valid = row >= 0
+        cols, sims = row[valid], self.scores[item][valid]
+        return (cols, sims) if n is None else (cols[:n], sims[:n])
+
+    # Aggregate the neighbour lists of several products (e.g. a user's purchases)
+    def recommend_for(self, items, n=5, exclude=()):
+        totals = {}
+        for item in items:
+            cols, sims = self.similar(item)
+            for col, sim in zip(cols.tolist(), sims.tolist()):
+                totals[col] = totals.get(col, 0.0) + sim
+        excluded = set(exclude)
+        ranked = sorted((col for col in totals if col not in excluded), key=lambda col: -totals[col])
+        return ranked[:n]
@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the standard library encoder
+    orjson = None
+
+
+# Called only for values the encoder does not handle natively
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, bytes):
+        return None  # Image blobs are never sent to clients
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    Encodes Mongo documents as they come out of pymongo, in one pass: ObjectId,
+    datetime and bytes go through a default hook instead of a recursive copy.
+    Uses orjson when installed, the stdlib json module otherwise.
+    """
+
+    sort_keys = False
+
+    def _encode(self, obj):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+            except TypeError:
+                pass  # e.g. non-string dict keys, let the stdlib encoder try
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', False)
+            return json.dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b"\n", mimetype=self.mimetype)
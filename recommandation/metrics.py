@@ -0,0 +1,93 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; chosen to separate in-memory lookups from Mongo round-trips and refits
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics), thread-safe."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, total = [], 0
+            for c in self.counts:
+                total += c
+                cumulative.append(total)
+            return cumulative, self.count, self.sum
+
+
+class StageMetrics:
+    """Per-stage latency histograms plus plain counters, rendered for /metrics."""
+
+    def __init__(self, prefix='recommendation'):
+        self.prefix = prefix
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        with self._lock:
+            if stage not in self._histograms:
+                self._histograms[stage] = Histogram()
+            return self._histograms[stage]
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # Prometheus text exposition format
+    def render(self, gauges=None):
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {name} Time spent per recommendation stage.", f"# TYPE {name} histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for stage, histogram in histograms:
+            cumulative, count, total = histogram.snapshot()
+            for bound, value in zip(histogram.buckets, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {value}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        for counter, value in counters:
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            lines.append(f"{self.prefix}_{counter}_total {value}")
+        for gauge, value in sorted((gauges or {}).items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {self.prefix}_{gauge} gauge")
+            lines.append(f"{self.prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by all modules of the service
+metrics = StageMetrics()
@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+
+from als import als_fold_in, fit_als
+from interaction_store import snapshot_from_arrays
+from item_index import ItemNeighborIndex
+from neighbors import build_index
+from metrics import metrics
+from snapshots import RefitLock, latest_version, load_latest, save_snapshot
+from structured_logging import get_logger
+
+log = get_logger('model_manager')
+
+
+# Fit user/item factors with TruncatedSVD
+def fit_svd(matrix, n_components=2):
+    # Utiliser au plus n_components, moins si la matrice est trop petite
+    n_components = max(1, min(n_components, matrix.shape[1] - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=42)
+    user_factors = svd.fit_transform(matrix)
+    item_factors = svd.components_.T
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+# Model engines selectable with MODEL_ENGINE
+ENGINES = {
+    'svd': fit_svd,
+    'als': fit_als,
+}
+
+
+class FactorModel:
+    """Trained factors plus the interaction snapshot they were fitted on. Never mutated."""
+
+    def __init__(self, version, snapshot, user_factors, item_factors, item_index, fit_seconds, index_kind='exact',
+                 user_vectors=None, trained_at=None, engine='svd', engine_options=None):
+        self.version = version
+        self.engine = engine
+        self.engine_options = engine_options or {}
+        self.snapshot = snapshot
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        if user_vectors is None:
+            self.neighbors = build_index(user_factors, index_kind)
+        else:
+            self.neighbors = build_index(user_vectors, index_kind, normalized=True)
+        self.item_index = item_index
+        self.fit_seconds = fit_seconds
+        self.trained_at = trained_at or time.time()
+
+    # Embedding of a user, folding in users who bought after the last refit
+    def user_vector(self, user_id, live_snapshot=None):
+        row = self.snapshot.user_row(user_id)
+        if row is not None:
+            return self.user_factors[row]
+        live_row = live_snapshot.user_row(user_id) if live_snapshot is not None else None
+        if live_row is None:
+            return None
+        matrix = live_snapshot.matrix
+        start, end = matrix.indptr[live_row], matrix.indptr[live_row + 1]
+        cols, values = [], []
+        for col, value in zip(matrix.indices[start:end], matrix.data[start:end]):
+            model_col = self.snapshot.product_col(live_snapshot.product_ids[col])
+            if model_col is not None:
+                cols.append(model_col)
+                values.append(value)
+        if not cols:
+            return None
+        if self.engine == 'als':
+            options = {k: v for k, v in self.engine_options.items() if k in ('regularization', 'alpha')}
+            return als_fold_in(self.item_factors, cols, values, **options)
+        # TruncatedSVD.transform: project the live purchase row onto the item factors
+        return np.asarray(values, dtype=np.float32) @ self.item_factors[cols]
+
+    # k most similar users (cosine), never the user themself
+    def similar_users(self, user_id, user_vector, k=5):
+        if not np.any(user_vector):
+            return np.empty(0, dtype=np.int64)
+        ids, _ = self.neighbors.search(user_vector, k, exclude=self.snapshot.user_row(user_id))
+        return ids
+
+    # Top-n product ids for many users in one vectorized pass; None for unknown users
+    def recommend_many(self, user_ids, live_snapshot, n=5, n_neighbors=5):
+        vectors, rows, known = [], [], []
+        for i, user_id in enumerate(user_ids):
+            vector = self.user_vector(user_id, live_snapshot)
+            if vector is not None and np.any(vector):
+                vectors.append(vector)
+                rows.append(self.snapshot.user_row(user_id))
+                known.append(i)
+        results = [None] * len(user_ids)
+        if not known:
+            return results
+
+        neighbor_ids, neighbor_scores = self.neighbors.search_many(np.vstack(vectors), n_neighbors, exclude=rows)
+        valid = np.isfinite(neighbor_scores)
+        # Sum the purchase rows of each user's neighbours: (batch x users) @ (users x products)
+        weights = sp.csr_matrix(
+            (np.ones(valid.sum(), dtype=np.float32), (np.nonzero(valid)[0], neighbor_ids[valid])),
+            shape=(len(known), self.snapshot.matrix.shape[0])
+        )
+        scores = (weights @ self.snapshot.matrix).toarray()
+
+        # Mask products each user already bought (live purchases, mapped to model columns)
+        mask_rows, mask_cols = [], []
+        for b, i in enumerate(known):
+            for pid in live_snapshot.purchased_products(user_ids[i]):
+                col = self.snapshot.product_col(pid)
+                if col is not None:
+                    mask_rows.append(b)
+                    mask_cols.append(col)
+        scores[mask_rows, mask_cols] = 0
+
+        n = min(n, scores.shape[1])
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for b, i in enumerate(known):
+            results[i] = [self.snapshot.product_ids[col] for col, s in zip(top[b], top_scores[b]) if s > 0]
+        return results
+
+    # Products bought together with product_id, as (product ids, scores)
+    def similar_products(self, product_id, n=10):
+        col = self.snapshot.product_col(product_id)
+        if col is None:
+            return [], []
+        cols, sims = self.item_index.similar(col, n)
+        return [self.snapshot.product_ids[c] for c in cols], sims.tolist()
+
+    # Item-based recommendations from a list of purchased product ids
+    def recommend_from_items(self, product_ids, n=5):
+        cols = [c for c in (self.snapshot.product_col(p) for p in product_ids) if c is not None]
+        return [self.snapshot.product_ids[c] for c in self.item_index.recommend_for(cols, n, exclude=cols)]
+
+
+class ModelManager:
+    """
+    Refits the factor model in a background thread, either on a schedule or
+    once enough new interactions have arrived, and swaps it in atomically.
+    Requests only read `manager.model`.
+    """
+
+    def __init__(self, store, n_components=2, refit_interval=600.0, refit_after=100, check_interval=5.0,
+                 index_kind='exact', item_neighbors=20, snapshot_dir=None, engine='svd', engine_options=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown model engine: {engine}")
+        self.store = store
+        self.engine = engine
+        self.engine_options = engine_options or {}
+        self.n_components = n_components
+        self.index_kind = index_kind
+        self.item_neighbors = item_neighbors
+        self.refit_interval = refit_interval
+        self.refit_after = refit_after
+        self.check_interval = check_interval
+        self.snapshot_dir = snapshot_dir
+        self.model = None
+        self._version = 0
+        self._refit_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # Settings shared by the API and the offline jobs (precompute.py)
+    @classmethod
+    def from_env(cls, store):
+        engine = os.getenv('MODEL_ENGINE', 'svd')
+        return cls(
+            store,
+            # ALS needs a much higher rank than the SVD default
+            n_components=int(os.getenv('ALS_COMPONENTS', '32')) if engine == 'als'
+            else int(os.getenv('MODEL_COMPONENTS', '2')),
+            refit_interval=float(os.getenv('MODEL_REFIT_SECONDS', '600')),
+            refit_after=int(os.getenv('MODEL_REFIT_AFTER', '100')),
+            index_kind=os.getenv('NEIGHBOR_INDEX', 'exact'),
+            item_neighbors=int(os.getenv('ITEM_NEIGHBORS', '20')),
+            snapshot_dir=os.getenv('MODEL_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_snapshots')),
+            engine=engine,
+            engine_options={
+                'regularization': float(os.getenv('ALS_REGULARIZATION', '0.1')),
+                'alpha': float(os.getenv('ALS_ALPHA', '40')),
+                'iterations': int(os.getenv('ALS_ITERATIONS', '15')),
+                'threads': int(os.getenv('ALS_THREADS', '0')) or None,
+            } if engine == 'als' else None
+        )
+
+    def refit(self):
+        with self._refit_lock:
+            snapshot = self.store.snapshot
+            if snapshot.empty:
+                return self.model
+            # Avec plusieurs workers, un seul réentraîne ; les autres rechargent son snapshot
+            file_lock = RefitLock(self.snapshot_dir) if self.snapshot_dir else None
+            if file_lock is not None and not file_lock.acquire():
+                return self.model
+            try:
+                start = time.perf_counter()
+                with metrics.timed(f'{self.engine}_fit'):
+                    user_factors, item_factors = ENGINES[self.engine](
+                        snapshot.matrix, n_components=self.n_components, **self.engine_options
+                    )
+                with metrics.timed('item_index_build'):
+                    item_index = ItemNeighborIndex.build(snapshot.baskets, self.item_neighbors)
+                if self.snapshot_dir:
+                    self._version = max(self._version, latest_version(self.snapshot_dir))
+                self._version += 1
+                model = FactorModel(self._version, snapshot, user_factors, item_factors, item_index, 0.0,
+                                    self.index_kind, engine=self.engine, engine_options=self.engine_options)
+                model.fit_seconds = fit_seconds = time.perf_counter() - start
+                if self.snapshot_dir:
+                    with metrics.timed('snapshot_save'):
+                        save_snapshot(model, self.snapshot_dir)
+            finally:
+                if file_lock is not None:
+                    file_lock.release()
+            # Single reference assignment: readers see either the old or the new model
+            self.model = model
+            log.info("model_refitted", version=self._version, engine=self.engine,
+                     shape=list(snapshot.matrix.shape), seconds=round(fit_seconds, 4))
+            return self.model
+
+    # Swap in the latest saved model, memory-mapped read-only; returns (meta, arrays, snapshot) or None.
+    # A missing, pruned or half-written snapshot is logged and ignored: callers fall back to a full load.
+    def load_snapshot(self):
+        if not self.snapshot_dir:
+            return None
+        try:
+            saved = load_latest(self.snapshot_dir)
+            if saved is None:
+                return None
+            meta, arrays = saved
+            if self.model is not None and meta['version'] <= self.model.version:
+                return None
+            # Built once and shared with InteractionStore.restore (interners are append-only)
+            snapshot = snapshot_from_arrays(meta, arrays)
+            item_index = ItemNeighborIndex(arrays['item_neighbors'], arrays['item_scores'])
+            model = FactorModel(
+                meta['version'], snapshot, arrays['user_factors'], arrays['item_factors'], item_index,
+                meta['fitSeconds'], self.index_kind, user_vectors=arrays['user_vectors'], trained_at=meta['trainedAt'],
+                engine=meta.get('engine', 'svd'), engine_options=meta.get('engineOptions')
+            )
+        except (OSError, KeyError, ValueError) as e:
+            log.error("snapshot_load_failed", directory=self.snapshot_dir, error=str(e), exc_info=True)
+            return None
+        self.model = model
+        self._version = max(self._version, meta['version'])
+        log.info("model_loaded_from_snapshot", version=meta['version'], directory=self.snapshot_dir)
+        return meta, arrays, snapshot
+
+    def pending_interactions(self):
+        if self.model is None:
+            return self.store.snapshot.interactions
+        return self.store.snapshot.interactions - self.model.snapshot.interactions
+
+    def _should_refit(self):
+        pending = self.pending_interactions()
+        if pending <= 0:
+            return False
+        if self.model is None or pending >= self.refit_after:
+            return True
+        return time.time() - self.model.trained_at >= self.refit_interval
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                if self.snapshot_dir and latest_version(self.snapshot_dir) > self._version:
+                    self.load_snapshot()
+                elif self._should_refit():
+                    self.refit()
+            except Exception as e:
+                log.error("model_refit_failed", error=str(e), exc_info=True)
+
+    def start(self):
+        if self.model is None:
+            self.refit()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-manager", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        model = self.model
+        return {
+            'version': model.version if model else None,
+            'engine': model.engine if model else self.engine,
+            'trainedAt': model.trained_at if model else None,
+            'lastRefitSeconds': model.fit_seconds if model else None,
+            'shape': list(model.snapshot.matrix.shape) if model else None,
+            'pendingInteractions': self.pending_interactions(),
+        }
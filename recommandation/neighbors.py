@@ -0,0 +1,124 @@
+import numpy as np
+
+
+def normalize_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def _top_k(scores, ids, k):
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[part], ids[part]
+    order = np.argsort(-scores, kind='stable')
+    return ids[order], scores[order]
+
+
+class ExactNeighbors:
+    """
+    Exact cosine top-k over normalized vectors. Scores are computed block by
+    block and only the best k of each block are kept, so memory stays
+    O(block_size) instead of O(n_users) per query.
+    """
+
+    def __init__(self, vectors, block_size=65536, normalized=False):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.block_size = block_size
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def _score_rows(self, query, rows):
+        return self.vectors[rows] @ query
+
+    def search(self, query, k=5, exclude=None):
+        query = normalize_rows(np.atleast_2d(query))[0]
+        n = len(self)
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            scores = self.vectors[start:end] @ query
+            ids = np.arange(start, end)
+            if exclude is not None and start <= exclude < end:
+                scores[exclude - start] = -np.inf
+            ids, scores = _top_k(scores, ids, k)
+            ids, scores = _top_k(np.concatenate([best_scores, scores]), np.concatenate([best_ids, ids]), k)
+            best_ids, best_scores = ids, scores
+        keep = np.isfinite(best_scores)
+        return best_ids[keep], best_scores[keep]
+
+    # Top-k for several queries at once: one matrix multiply per block
+    def search_many(self, queries, k=5, exclude=None):
+        queries = normalize_rows(np.atleast_2d(queries))
+        n, q = len(self), queries.shape[0]
+        k = min(k, n)
+        best_ids = np.empty((q, 0), dtype=np.int64)
+        best_scores = np.empty((q, 0), dtype=np.float32)
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            scores = queries @ self.vectors[start:end].T
+            if exclude is not None:
+                for i, row in enumerate(exclude):
+                    if row is not None and start <= row < end:
+                        scores[i, row - start] = -np.inf
+            ids = np.broadcast_to(np.arange(start, end), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, ids], axis=1)
+            if scores.shape[1] > k:
+                part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, part, axis=1)
+                ids = np.take_along_axis(ids, part, axis=1)
+            best_ids, best_scores = ids, scores
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class LSHNeighbors(ExactNeighbors):
+    """
+    Approximate cosine top-k with random-projection LSH. Each table hashes a
+    vector to the sign pattern of n_bits random hyperplanes; candidates from
+    the query's buckets are re-ranked exactly. Falls back to the exact search
+    when the buckets hold fewer than k candidates.
+    """
+
+    def __init__(self, vectors, n_bits=12, n_tables=4, seed=42, block_size=65536, normalized=False):
+        super().__init__(vectors, block_size, normalized)
+        rng = np.random.default_rng(seed)
+        dim = self.vectors.shape[1]
+        self.planes = rng.standard_normal((n_tables, dim, n_bits)).astype(np.float32)
+        self._weights = (1 << np.arange(n_bits)).astype(np.int64)
+        self.tables = []
+        for planes in self.planes:
+            codes = self._hash(self.vectors, planes)
+            order = np.argsort(codes, kind='stable')
+            self.tables.append((codes[order], order))
+
+    def _hash(self, vectors, planes):
+        return ((vectors @ planes) > 0).astype(np.int64) @ self._weights
+
+    def _candidates(self, query):
+        found = []
+        for planes, (codes, order) in zip(self.planes, self.tables):
+            code = self._hash(query[None, :], planes)[0]
+            lo, hi = np.searchsorted(codes, code, 'left'), np.searchsorted(codes, code, 'right')
+            found.append(order[lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def search(self, query, k=5, exclude=None):
+        query = normalize_rows(np.atleast_2d(query))[0]
+        candidates = self._candidates(query)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if len(candidates) < k:
+            return super().search(query, k, exclude)
+        ids, scores = _top_k(self._score_rows(query, candidates), candidates, k)
+        return ids, scores
+
+
+def build_index(vectors, kind='exact', normalized=False):
+    if kind == 'lsh':
+        return LSHNeighbors(vectors, normalized=normalized)
+    return ExactNeighbors(vectors, normalized=normalized)
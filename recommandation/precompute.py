@@ -0,0 +1,133 @@
+"""
+Offline job: compute the top-N recommendations of every known user with the
+current factor model and upsert them into db.recommendations, which
+/recommend reads before computing anything online.
+
+Users are processed in _id order and a checkpoint is written after every
+chunk, so an interrupted run continues with --resume. A range can also be
+given explicitly (e.g. to split the work across several cron jobs):
+
+    python precompute.py
+    python precompute.py --resume
+    python precompute.py --start-after 65a0... --end 65f0... --chunk-size 1000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import DeleteOne, MongoClient, UpdateOne
+
+from interaction_store import InteractionStore
+from metrics import metrics
+from model_manager import ModelManager
+from structured_logging import get_logger
+
+log = get_logger('precompute')
+
+RECOMMENDATIONS = 'recommendations'
+JOBS = 'recommendation_jobs'
+JOB_ID = 'precompute'
+
+
+# Users of the live snapshot within (start_after, end], in ObjectId order
+def users_in_range(snapshot, start_after=None, end=None):
+    user_ids = sorted(u for u in snapshot.user_ids[:snapshot.matrix.shape[0]] if ObjectId.is_valid(u))
+    return [u for u in user_ids if (start_after is None or u > start_after) and (end is None or u <= end)]
+
+
+def write_chunk(db, user_ids, results, model_version):
+    computed_at = datetime.now(timezone.utc)
+    operations, written = [], 0
+    for user_id, product_ids in zip(user_ids, results):
+        if product_ids:
+            operations.append(UpdateOne(
+                {'_id': ObjectId(user_id)},
+                {'$set': {'productIds': product_ids, 'modelVersion': model_version, 'computedAt': computed_at}},
+                upsert=True
+            ))
+            written += 1
+        else:
+            # No recommendation any more: drop the previous row rather than serving it
+            operations.append(DeleteOne({'_id': ObjectId(user_id)}))
+    if operations:
+        db[RECOMMENDATIONS].bulk_write(operations, ordered=False)
+    return written
+
+
+def save_checkpoint(db, model_version, last_user_id, end):
+    db[JOBS].update_one(
+        {'_id': JOB_ID},
+        {'$set': {'modelVersion': model_version, 'lastUserId': last_user_id, 'end': end,
+                  'updatedAt': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+# Where an interrupted run of the same model version stopped
+def resume_point(db, model_version):
+    job = db[JOBS].find_one({'_id': JOB_ID})
+    if not job or job.get('modelVersion') != model_version:
+        return None, None
+    return job.get('lastUserId'), job.get('end')
+
+
+def precompute(db, manager, store, n=5, chunk_size=500, start_after=None, end=None):
+    model, snapshot = manager.model, store.snapshot
+    user_ids = users_in_range(snapshot, start_after, end)
+    log.info("precompute_started", model_version=model.version, users=len(user_ids), start_after=start_after, end=end)
+    written = 0
+    start = time.perf_counter()
+    for offset in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[offset:offset + chunk_size]
+        with metrics.timed('precompute_scoring'):
+            results = model.recommend_many(chunk, snapshot, n=n)
+        with metrics.timed('precompute_write'):
+            written += write_chunk(db, chunk, results, model.version)
+        save_checkpoint(db, model.version, chunk[-1], end)
+        log.info("precompute_chunk_written", last_user_id=chunk[-1], done=offset + len(chunk), total=len(user_ids))
+    log.info("precompute_finished", model_version=model.version, users=len(user_ids), written=written,
+             seconds=round(time.perf_counter() - start, 3))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=5, help='recommendations per user')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--start-after', help='only users with _id greater than this one')
+    parser.add_argument('--end', help='only users with _id up to this one (inclusive)')
+    parser.add_argument('--resume', action='store_true', help='continue the last run of the same model version')
+    parser.add_argument('--refit', action='store_true', help='refit the model instead of using the latest snapshot')
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/craft_hub'))
+    db = client['craft_hub']
+
+    store = InteractionStore(db)
+    manager = ModelManager.from_env(store)
+    saved = manager.load_snapshot()
+    if saved is not None:
+        store.restore(*saved)
+        store.poll()
+    else:
+        store.load()
+    if manager.model is None or args.refit:
+        manager.refit()
+    if manager.model is None:
+        log.warning("precompute_skipped", reason="no_interactions")
+        return
+
+    start_after, end = args.start_after, args.end
+    if args.resume:
+        checkpoint, checkpoint_end = resume_point(db, manager.model.version)
+        if checkpoint is not None:
+            start_after, end = max(checkpoint, start_after or ''), end or checkpoint_end
+    precompute(db, manager, store, n=args.n, chunk_size=args.chunk_size, start_after=start_after, end=end)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,86 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 import os
+from datetime import datetime, timezone
 from bson.objectid import ObjectId
-from sklearn.decomposition import TruncatedSVD
+from catalog_cache import CatalogCache, PRODUCT_PROJECTION
+from interaction_store import InteractionStore
+from json_provider import MongoJSONProvider
+from model_manager import ModelManager
+from precompute import RECOMMENDATIONS
+from metrics import metrics
+from result_cache import LRUCache
+from trending import TrendingIndex
+from structured_logging import get_logger
 # Initialize Flask app
 app = Flask(__name__)
+# Documents are encoded straight from pymongo (ObjectId, datetime, bytes handled by the provider)
+app.json = MongoJSONProvider(app)
 CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "*"]}}, supports_credentials=True)
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger('api')
+
 # Connect to MongoDB
 try:
     client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/craft_hub'))
     db = client['craft_hub']
     client.server_info()  # Test connection
-    print("Connected to MongoDB successfully")
+    log.info("mongo_connected")
 except Exception as e:
-    print(f"Failed to connect to MongoDB: {e}")
+    log.error("mongo_connection_failed", error=str(e))
     exit(1)
 
+# Keep the user-product matrix in memory, refreshed from new payments
+interaction_store = InteractionStore(db, poll_interval=float(os.getenv('INTERACTION_POLL_SECONDS', '30')))
+
+# Factor model refitted in the background and hot-swapped
+model_manager = ModelManager.from_env(interaction_store)
+
+# Démarrage rapide : reprendre le dernier snapshot (mmap) puis seulement les nouveaux paiements
+saved = model_manager.load_snapshot()
+if saved is not None:
+    interaction_store.restore(*saved)
+interaction_store.start()
+model_manager.start()
+
+# Per-user recommendation results, keyed by model version, and serialized products
+result_cache = LRUCache(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('RESULT_CACHE_SECONDS', '300'))
+)
+product_cache = LRUCache(
+    max_entries=int(os.getenv('PRODUCT_CACHE_SIZE', '20000')),
+    ttl=float(os.getenv('PRODUCT_CACHE_SECONDS', '300'))
+)
+
+# A new payment changes the buyer's recommendations and the stock of what was bought
+def invalidate_on_payments(user_ids, product_ids):
+    for user_id in user_ids:
+        result_cache.invalidate(user_id)
+    for product_id in product_ids:
+        product_cache.invalidate(product_id)
+
+interaction_store.add_listener(invalidate_on_payments)
+
+# Batch endpoint limits
+MAX_BATCH_USERS = int(os.getenv('MAX_BATCH_USERS', '10000'))
+
+# Rows written by precompute.py are served before any online computation
+USE_MATERIALIZED = os.getenv('MATERIALIZED_RECOMMENDATIONS', '1') == '1'
+MATERIALIZED_MAX_AGE = float(os.getenv('MATERIALIZED_MAX_AGE_SECONDS', '86400'))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '256'))
+
 # Handle CORS preflight requests
 @app.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
-        print("Received OPTIONS preflight request")
+        log.debug("preflight_received", path=request.path)
         response = jsonify({"message": "Preflight OK"})
         response.headers.add("Access-Control-Allow-Origin", "http://localhost:3000")
         response.headers.add("Access-Control-Allow-Headers", "Content-Type, Authorization")
@@ -39,217 +90,345 @@ def handle_preflight():
 # Test endpoint to verify connectivity
 @app.route('/test', methods=['POST', 'OPTIONS'])
 def test():
-    print("Received request on /test endpoint")
     data = request.get_json(silent=True)
     headers = dict(request.headers)
-    print(f"Test endpoint - Headers: {headers}")
-    print(f"Test endpoint - Data: {data}")
+    log.debug("test_request", data=data)
     return jsonify({"message": "Test request received", "data": data, "headers": headers}), 200
 
-# Serialize MongoDB ObjectId and handle bytes
-def serialize_object(obj):
-    if isinstance(obj, dict):
-        return {key: serialize_object(value) for key, value in obj.items() if not (isinstance(value, bytes) and key == 'data')}
-    elif isinstance(obj, list):
-        return [serialize_object(item) for item in obj if item]  # Filter out None
-    elif isinstance(obj, ObjectId):
-        return str(obj)
-    elif isinstance(obj, bytes):
-        return None
-    return obj
+# Cold-start data: user category profiles and in-stock products per category
+catalog_cache = CatalogCache(
+    db, interaction_store,
+    ttl=float(os.getenv('CATALOG_CACHE_SECONDS', '300'))
+)
 
-# Get interaction data
-def get_interaction_data():
-    try:
-        pipeline = [
-            {"$unwind": "$items"},
-            {"$project": {
-                "userId": {"$toString": "$userId"},
-                "productId": {"$toString": "$items._id"},
-                "rating": {"$literal": 4}
-            }},
-            {"$match": {"productId": {"$exists": True, "$ne": None}}}
-        ]
-        payments = list(db.payments.aggregate(pipeline))
-        print(f"Interaction data rows: {len(payments)}")
-        return pd.DataFrame(payments) if payments else pd.DataFrame()
-    except Exception as e:
-        print(f"Error in get_interaction_data: {e}")
-        return pd.DataFrame()
+# Time-decayed best sellers, global and per category, kept up to date from new payments
+trending = TrendingIndex(
+    half_life_days=float(os.getenv('TRENDING_HALF_LIFE_DAYS', '7')),
+    size=int(os.getenv('TRENDING_SIZE', '50')),
+    category_of=catalog_cache.product_category
+)
+trending.load(db, interaction_store.add_interaction_listener(trending.add))
 
-# Prepare user-product matrix
-def prepare_matrix(df):
+# Get user categories (from the in-memory catalog cache)
+def get_user_categories(user_id):
     try:
-        pivot_table = df.pivot_table(index='userId', columns='productId', values='rating').fillna(0)
-        print(f"Matrix shape: {pivot_table.shape}")
-        return pivot_table if not pivot_table.empty else pd.DataFrame()
+        categories = catalog_cache.user_categories(str(user_id))
+        log.debug("user_categories", user_id=user_id, categories=categories)
+        return categories
     except Exception as e:
-        print(f"Error in prepare_matrix: {e}")
-        return pd.DataFrame()
+        log.error("user_categories_failed", user_id=user_id, error=str(e))
+        return []
 
-# Get purchased products
-def get_user_purchased_products(user_id):
+# Get in-stock products by category (from the in-memory catalog cache)
+def get_products_by_category(categories):
     try:
-        payments = db.payments.find({"userId": ObjectId(user_id)})
-        purchased_ids = [str(item.get('_id')) for payment in payments for item in payment.get('items', []) if item.get('_id')]
-        print(f"Purchased products for user {user_id}: {purchased_ids}")
-        return purchased_ids
+        if not categories:
+            log.debug("no_categories_for_lookup")
+            return []
+        serialized_products = catalog_cache.products_by_category(categories, limit=5)
+        log.debug("products_by_category", categories=categories, count=len(serialized_products))
+        return serialized_products
     except Exception as e:
-        print(f"Error in get_user_purchased_products: {e}")
+        log.error("products_by_category_failed", error=str(e))
         return []
 
-# Get user categories
-def get_user_categories(user_id):
+# In-stock trending products, from the user's categories first, then overall
+def get_trending_products(categories, purchased=(), limit=5):
     try:
-        pipeline = [
-            {"$match": {"userId": ObjectId(user_id)}},
-            {"$unwind": "$items"},
-            {"$lookup": {
-                "from": "products",
-                "localField": "items._id",
-                "foreignField": "_id",
-                "as": "product"
-            }},
-            {"$unwind": {"path": "$product", "preserveNullAndEmptyArrays": True}},
-            {"$match": {"product": {"$ne": None}}},
-            {"$group": {
-                "_id": "$product.category",
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"count": -1}}
-        ]
-        categories = list(db.payments.aggregate(pipeline))
-        print(f"User categories: {categories}")
-        return [cat['_id'] for cat in categories if cat['_id'] and cat['_id'] != "null"]
+        candidates = [pid for category in categories or [] for pid in trending.top(category)] + trending.top()
+        candidates = [pid for pid in dict.fromkeys(candidates) if pid not in purchased]
+        products = get_products_by_ids(candidates[:limit * 4])
+        return [p for p in products if (p.get('stock') or 0) > 0][:limit]
     except Exception as e:
-        print(f"Error in get_user_categories: {e}")
+        log.error("trending_products_failed", error=str(e))
         return []
 
-# Get products by category
-def get_products_by_category(categories):
+# Cold start: in-stock products of the user's categories, else what is trending
+def cold_start_recommendations(user_id, purchased=()):
+    user_categories = get_user_categories(user_id)
+    recommended_products = get_products_by_category(user_categories)
+    if not recommended_products:
+        log.debug("recommend_fallback", user_id=str(user_id), reason="no_category_products", strategy="trending")
+        recommended_products = get_trending_products(user_categories, purchased)
+    if not recommended_products:
+        return {'message': 'No recommendations yet, explore products!'}, 404
+    return {'recommendations': recommended_products}, 200
+
+# Model version and refit cost, to watch staleness
+@app.route('/model/status', methods=['GET'])
+def model_status():
+    return jsonify(model_manager.status()), 200
+
+# Explicit cache invalidation, e.g. after a product's stock or category changed
+@app.route('/cache/invalidate', methods=['POST', 'OPTIONS'])
+def invalidate_cache():
+    data = request.get_json(silent=True) or {}
+    product_ids = data.get('productIds')
+    if product_ids is not None and not isinstance(product_ids, list):
+        return jsonify({'error': 'productIds must be a list'}), 400
     try:
-        if not categories:
-            print("No categories provided for product lookup")
-            return []
-        products = list(db.products.find({
-            "category": {"$in": categories},
-            "stock": {"$gt": 0}  # Ajout pour éviter les produits épuisés
-        }, {'images.data': 0}).limit(5))
-        serialized_products = serialize_object(products)
-        print(f"Products by category: {serialized_products}")
-        return serialized_products
+        catalog_cache.invalidate(product_ids)
+        # Cached /recommend bodies embed full product documents
+        result_cache.clear()
+        if product_ids:
+            for pid in product_ids:
+                product_cache.invalidate(pid)
+        else:
+            product_cache.clear()
     except Exception as e:
-        print(f"Error in get_products_by_category: {e}")
-        return []
+        log.error("cache_invalidation_failed", error=str(e))
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+    return jsonify({'message': 'Cache invalidated'}), 200
+
+# Per-stage latency histograms and model/cache gauges (Prometheus text format)
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    status = model_manager.status()
+    results = result_cache.stats()
+    gauges = {
+        'model_version': status['version'],
+        'model_last_refit_seconds': status['lastRefitSeconds'],
+        'model_pending_interactions': status['pendingInteractions'],
+        'result_cache_hits': results['hits'],
+        'result_cache_misses': results['misses'],
+        'result_cache_evictions': results['evictions'],
+    }
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+# Result and product cache counters, to size the caches
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'results': result_cache.stats(), 'products': product_cache.stats(), 'trending': trending.stats()
+    }), 200
+
+# Validate a 24-character hex ObjectId string
+def is_valid_object_id(value):
+    return isinstance(value, str) and len(value) == 24 and all(c in '0123456789abcdefABCDEF' for c in value)
+
+# Serialized product documents for the given ids, fetching only cache misses
+def get_products_by_ids(product_ids):
+    product_ids = [pid for pid in dict.fromkeys(product_ids) if is_valid_object_id(pid)]
+    found = product_cache.get_many(product_ids)
+    missing = [pid for pid in product_ids if pid not in found]
+    if missing:
+        with metrics.timed('mongo_products'):
+            products = db.products.find({'_id': {'$in': [ObjectId(pid) for pid in missing]}}, PRODUCT_PROJECTION)
+            for product in products:
+                product_cache.put(str(product['_id']), product)
+                found[str(product['_id'])] = product
+    return [found[pid] for pid in product_ids if pid in found]
+
+# Precomputed recommendations, minus anything bought since the job ran; None if there are none
+def get_materialized_recommendations(user_id, snapshot):
+    with metrics.timed('mongo_materialized'):
+        row = db[RECOMMENDATIONS].find_one({'_id': ObjectId(user_id)}, {'productIds': 1, 'computedAt': 1})
+    if not row:
+        return None
+    # The API refits between job runs, so rows are aged by time, not by model version:
+    # rows left behind by a job that stopped running are scored live instead
+    computed_at = row.get('computedAt')
+    if computed_at is None:
+        return None
+    if computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    if (datetime.now(timezone.utc) - computed_at).total_seconds() > MATERIALIZED_MAX_AGE:
+        return None
+    purchased = set(snapshot.purchased_products(user_id))
+    product_ids = [pid for pid in row.get('productIds') or [] if pid not in purchased]
+    return get_products_by_ids(product_ids) or None
+
+# Compute recommendations for one user, returns (body, status)
+def compute_recommendations(user_id, model, snapshot):
+    if model is None or snapshot.empty:
+        log.debug("recommend_fallback", user_id=user_id, reason="no_interactions", strategy="category")
+        return cold_start_recommendations(user_id)
+
+    user_id_str = str(user_id)
+    user_vector = model.user_vector(user_id_str, snapshot)
+    if user_vector is None:
+        purchased_products = snapshot.purchased_products(user_id_str)
+        item_based = model.recommend_from_items(purchased_products)
+        if item_based:
+            log.debug("recommend_fallback", user_id=user_id_str, reason="unknown_user", strategy="item")
+            recommended_products = get_products_by_ids(item_based)
+            if recommended_products:
+                return {'recommendations': recommended_products}, 200
+        log.debug("recommend_fallback", user_id=user_id_str, reason="unknown_user", strategy="category")
+        return cold_start_recommendations(user_id, set(purchased_products))
+
+    purchased_products = snapshot.purchased_products(user_id_str)
+    # Les facteurs SVD sont précalculés : recherche des k plus proches voisins uniquement
+    with metrics.timed('similarity'):
+        similar_users = model.similar_users(user_id_str, user_vector, k=5)
+
+    with metrics.timed('scoring'):
+        matrix = model.snapshot.matrix
+        user_purchases = np.asarray(matrix[similar_users].sum(axis=0)).ravel()
+        top_products = np.argsort(-user_purchases, kind='stable')[:5]
+        # Products no neighbour bought score 0: leave the slot to the fallbacks below
+        recommendations = [model.snapshot.product_ids[i] for i in top_products if user_purchases[i] > 0]
+    log.debug("recommend_candidates", user_id=user_id_str, neighbours=similar_users.tolist(), products=recommendations)
+
+    # Filtrer les IDs valides (24 caractères hexadécimaux) et non achetés
+    valid_recommendations = [
+        pid for pid in recommendations
+        if pid not in purchased_products and is_valid_object_id(pid)
+    ]
+
+    if len(valid_recommendations) < 5:
+        # Compléter d'abord avec les produits achetés ensemble
+        item_based = [pid for pid in model.recommend_from_items(purchased_products, n=5)
+                      if pid not in purchased_products and is_valid_object_id(pid)]
+        valid_recommendations = list(dict.fromkeys(valid_recommendations + item_based))[:5]
+
+    if len(valid_recommendations) < 5:
+        user_categories = get_user_categories(user_id)
+        category_products = get_products_by_category(user_categories)
+        category_ids = [str(prod['_id']) for prod in category_products if str(prod['_id']) not in purchased_products]
+        valid_recommendations.extend(category_ids[:5 - len(valid_recommendations)])
+        valid_recommendations = list(dict.fromkeys(valid_recommendations))  # Remove duplicates
+
+    if len(valid_recommendations) < 5:
+        excluded = set(purchased_products).union(valid_recommendations)
+        trending_products = get_trending_products(user_categories, excluded, limit=5 - len(valid_recommendations))
+        valid_recommendations.extend(str(prod['_id']) for prod in trending_products)
+
+    if not valid_recommendations:
+        log.debug("recommend_empty", user_id=user_id_str)
+        return {'message': 'No new product recommendations found'}, 404
+
+    serialized_products = get_products_by_ids(valid_recommendations)
+    if not serialized_products:
+        log.debug("recommend_products_missing", user_id=user_id_str, product_ids=valid_recommendations)
+        return {'message': 'No products available for recommendation'}, 404
+
+    log.debug("recommend_served", user_id=user_id_str, count=len(serialized_products))
+    return {'recommendations': serialized_products}, 200
 
 # Recommendation endpoint
 @app.route('/recommend', methods=['POST', 'OPTIONS'])
 def recommend():
     try:
-        headers = dict(request.headers)
-        print(f"Received /recommend request - Headers: {headers}")
         data = request.get_json(silent=True)
-        print(f"Received /recommend request - Data: {data}")
-
         if not data:
-            print("No JSON data provided")
+            log.debug("recommend_rejected", reason="no_json")
             return jsonify({'error': 'No JSON data provided'}), 400
 
         user_id = data.get('userId')
         if not user_id:
-            print("No userId provided in request")
+            log.debug("recommend_rejected", reason="missing_user_id")
             return jsonify({'error': 'User ID is required'}), 400
 
-        if not isinstance(user_id, str) or len(user_id) != 24 or not all(c in '0123456789abcdefABCDEF' for c in user_id):
-            print(f"Invalid userId format: {user_id}")
+        if not is_valid_object_id(user_id):
+            log.debug("recommend_rejected", reason="invalid_user_id")
             return jsonify({'error': 'Valid User ID (24-character ObjectId) required'}), 400
 
-        df = get_interaction_data()
-        if df.empty:
-            print("No interaction data available, falling back to category-based recommendations")
-            user_categories = get_user_categories(user_id)
-            recommended_products = get_products_by_category(user_categories)
-            if not recommended_products:
-                return jsonify({'message': 'No recommendations yet, explore products!'}), 404
-            return jsonify({'recommendations': recommended_products}), 200
-
-        matrix = prepare_matrix(df)
-        if matrix.empty:
-            print("Empty user-product matrix, falling back to category-based recommendations")
-            user_categories = get_user_categories(user_id)
-            recommended_products = get_products_by_category(user_categories)
-            if not recommended_products:
-                return jsonify({'message': 'No recommendations yet, explore products!'}), 404
-            return jsonify({'recommendations': recommended_products}), 200
-
-        user_id_str = str(user_id)
-        if user_id_str not in matrix.index:
-            print(f"User {user_id_str} not found in matrix, using category-based recommendations")
-            user_categories = get_user_categories(user_id)
-            recommended_products = get_products_by_category(user_categories)
-            if not recommended_products:
-                return jsonify({'message': 'No recommendations yet, explore products!'}), 404
-            return jsonify({'recommendations': recommended_products}), 200
-
-        purchased_products = get_user_purchased_products(user_id)
-        # Appliquer SVD avec n_components adapté à la taille de la matrice
-        n_components = min(2, matrix.shape[1] - 1)  # Utiliser au plus 2 ou moins si la matrice est trop petite
-        if n_components < 1:
-            n_components = 1
-        svd = TruncatedSVD(n_components=n_components, random_state=42)
-        matrix_reduced = svd.fit_transform(matrix)
-        similarity = cosine_similarity(matrix_reduced)
-        user_idx = matrix.index.get_loc(user_id_str)
-        similar_users = np.argsort(similarity[user_idx])[::-1][1:6]
-        print(f"Similar users indices: {similar_users}")
-
-        similar_user_ids = matrix.index[similar_users]
-        user_purchases = matrix.loc[similar_user_ids].sum()
-        recommendations = user_purchases.sort_values(ascending=False).head(5).index.tolist()
-        print(f"Raw recommendations: {recommendations}")
-
-        # Filtrer les IDs valides (24 caractères hexadécimaux) et non achetés
-        valid_recommendations = [
-            pid for pid in recommendations
-            if pid not in purchased_products and
-            isinstance(pid, str) and
-            len(pid) == 24 and
-            all(c in '0123456789abcdefABCDEF' for c in pid)
-        ]
-        print(f"Valid recommendations after filtering: {valid_recommendations}")
-
-        if len(valid_recommendations) < 5:
-            user_categories = get_user_categories(user_id)
-            category_products = get_products_by_category(user_categories)
-            category_ids = [str(prod['_id']) for prod in category_products if str(prod['_id']) not in purchased_products]
-            valid_recommendations.extend(category_ids[:5 - len(valid_recommendations)])
-            valid_recommendations = list(dict.fromkeys(valid_recommendations))  # Remove duplicates
-
-        if not valid_recommendations:
-            print("No valid recommendations found")
-            return jsonify({'message': 'No new product recommendations found'}), 404
-
-        # Filtrer à nouveau pour s'assurer que seuls les IDs valides sont convertis en ObjectId
-        valid_object_ids = [pid for pid in valid_recommendations if len(pid) == 24 and all(c in '0123456789abcdefABCDEF' for c in pid)]
-        if not valid_object_ids:
-            print("No valid ObjectIds found for query")
-            return jsonify({'message': 'No valid product IDs for recommendation'}), 404
-
-        recommended_products = list(db.products.find({
-            '_id': {'$in': [ObjectId(pid) for pid in valid_object_ids]}
-        }, {'images.data': 0}))
-
-        if not recommended_products:
-            print("No products found for recommended IDs")
-            return jsonify({'message': 'No products available for recommendation'}), 404
-
-        serialized_products = serialize_object(recommended_products)
-        print(f"Returning recommendations: {serialized_products}")
-
-        return jsonify({'recommendations': serialized_products}), 200
+        model = model_manager.model
+        snapshot = interaction_store.snapshot
+        version = model.version if model is not None else 0
+        # Same key as invalidate_on_payments (lowercase hex from the interaction store)
+        cache_key = str(ObjectId(user_id))
+        cached = result_cache.get(cache_key, version)
+        if cached is None:
+            with metrics.timed('recommend'):
+                materialized = get_materialized_recommendations(user_id, snapshot) if USE_MATERIALIZED else None
+                if materialized:
+                    body, status = {'recommendations': materialized}, 200
+                else:
+                    body, status = compute_recommendations(user_id, model, snapshot)
+            result_cache.put(cache_key, (body, status), version)
+        else:
+            body, status = cached
+        with metrics.timed('serialization'):
+            return jsonify(body), status
     except Exception as e:
-        print(f"Error in recommend route: {str(e)}")
+        log.error("recommend_failed", error=str(e), exc_info=True)
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+# "Bought together" lookup from the precomputed item neighbour lists
+@app.route('/recommend/similar-products/<product_id>', methods=['GET', 'OPTIONS'])
+def similar_products(product_id):
+    if not is_valid_object_id(product_id):
+        return jsonify({'error': 'Valid Product ID (24-character ObjectId) required'}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    model = model_manager.model
+    if model is None:
+        return jsonify({'message': 'No similar products found'}), 404
+    product_ids, scores = model.similar_products(product_id, max(1, limit))
+    if not product_ids:
+        return jsonify({'message': 'No similar products found'}), 404
+
+    try:
+        found = {str(p['_id']): p for p in get_products_by_ids(product_ids)}
+    except Exception as e:
+        log.error("similar_products_failed", product_id=product_id, error=str(e))
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+    similar = [dict(found[pid], score=score) for pid, score in zip(product_ids, scores) if pid in found]
+    if not similar:
+        return jsonify({'message': 'No similar products found'}), 404
+    return jsonify({'productId': product_id, 'similarProducts': similar}), 200
+
+# Batch recommendation endpoint, streamed as NDJSON (one line per user)
+@app.route('/recommend/batch', methods=['POST', 'OPTIONS'])
+def recommend_batch():
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+
+    user_ids = data.get('userIds')
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({'error': 'userIds must be a non-empty list'}), 400
+    if len(user_ids) > MAX_BATCH_USERS:
+        return jsonify({'error': f'At most {MAX_BATCH_USERS} userIds per request'}), 400
+    invalid = [uid for uid in user_ids if not is_valid_object_id(uid)]
+    if invalid:
+        return jsonify({'error': 'Valid User IDs (24-character ObjectId) required', 'invalid': invalid[:10]}), 400
+
+    limit = data.get('limit', 5)
+    # JSON true/false arrive as bool, a subclass of int
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+
+    model = model_manager.model
+    snapshot = interaction_store.snapshot
+    popular = None
+
+    def generate():
+        nonlocal popular
+        for start in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+            chunk = user_ids[start:start + BATCH_CHUNK_SIZE]
+            try:
+                if model is None or snapshot.empty:
+                    results = [None] * len(chunk)
+                else:
+                    with metrics.timed('batch_scoring'):
+                        results = model.recommend_many(chunk, snapshot, n=limit)
+
+                # Un seul $in pour tous les produits du lot (hors cache)
+                wanted = {pid for ids in results if ids for pid in ids if is_valid_object_id(pid)}
+                products = {str(p['_id']): p for p in get_products_by_ids(list(wanted))} if wanted else {}
+
+                for user_id, ids in zip(chunk, results):
+                    line = {'userId': user_id, 'recommendations': [products[pid] for pid in ids or [] if pid in products]}
+                    if not line['recommendations']:
+                        # Cold-start users get the overall trending products
+                        if popular is None:
+                            popular = get_trending_products(None, limit=limit)
+                        line['recommendations'] = popular
+                    if not line['recommendations']:
+                        line['message'] = 'No recommendations yet, explore products!'
+                    yield app.json.dumps(line) + "\n"
+            except Exception as e:
+                log.error("recommend_batch_chunk_failed", chunk_start=start, error=str(e), exc_info=True)
+                for user_id in chunk:
+                    yield app.json.dumps({'userId': user_id, 'error': 'Internal server error'}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=5001)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process refit lock
+    fcntl = None
+
+LATEST_FILE = 'LATEST'
+LOCK_FILE = 'refit.lock'
+
+# Arrays written for every model version, all opened with mmap_mode='r'
+ARRAYS = [
+    'user_factors', 'user_vectors', 'item_factors', 'item_neighbors', 'item_scores',
+    'matrix_data', 'matrix_indices', 'matrix_indptr',
+    'baskets_data', 'baskets_indices', 'baskets_indptr',
+    'user_ids', 'product_ids',
+]
+
+
+def _ids_array(ids):
+    if not ids:
+        return np.empty(0, dtype='S24')
+    return np.array([i.encode() for i in ids])
+
+
+def _write_latest(directory, name):
+    tmp = os.path.join(directory, LATEST_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(directory, LATEST_FILE))
+
+
+def latest_version(directory):
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            name = f.read().strip()
+        with open(os.path.join(directory, name, 'meta.json')) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+# Write one model version to <directory>/v<version>, then point LATEST at it
+def save_snapshot(model, directory, keep=3):
+    os.makedirs(directory, exist_ok=True)
+    name = f"v{model.version:06d}"
+    tmp_dir = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    snapshot = model.snapshot
+    n_users, n_products = snapshot.matrix.shape
+    arrays = {
+        'user_factors': model.user_factors,
+        'user_vectors': model.neighbors.vectors,
+        'item_factors': model.item_factors,
+        'item_neighbors': model.item_index.neighbors,
+        'item_scores': model.item_index.scores,
+        'matrix_data': snapshot.matrix.data,
+        'matrix_indices': snapshot.matrix.indices,
+        'matrix_indptr': snapshot.matrix.indptr,
+        'baskets_data': snapshot.baskets.data,
+        'baskets_indices': snapshot.baskets.indices,
+        'baskets_indptr': snapshot.baskets.indptr,
+        'user_ids': _ids_array(snapshot.user_ids[:n_users]),
+        'product_ids': _ids_array(snapshot.product_ids[:n_products]),
+    }
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp_dir, key + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+    meta = {
+        'version': model.version,
+        'engine': model.engine,
+        'engineOptions': model.engine_options,
+        'trainedAt': model.trained_at,
+        'fitSeconds': model.fit_seconds,
+        'shape': [n_users, n_products],
+        'basketsShape': list(snapshot.baskets.shape),
+        'interactions': snapshot.interactions,
+        'lastPaymentId': str(snapshot.last_payment_id) if snapshot.last_payment_id is not None else None,
+        'savedAt': time.time(),
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    final_dir = os.path.join(directory, name)
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    _write_latest(directory, name)
+
+    # Older versions may still be mapped by other workers: on POSIX the files
+    # stay readable until unmapped, elsewhere the removal simply fails
+    versions = sorted(d for d in os.listdir(directory) if d.startswith('v') and os.path.isdir(os.path.join(directory, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return final_dir
+
+
+# Open the latest version read-only and memory-mapped; None if there is none.
+# A pruned or half-written version raises OSError, KeyError or ValueError.
+def load_latest(directory):
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, name)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {key: np.load(os.path.join(path, key + '.npy'), mmap_mode='r', allow_pickle=False) for key in ARRAYS}
+    arrays['user_ids'] = [i.decode() for i in arrays['user_ids']]
+    arrays['product_ids'] = [i.decode() for i in arrays['product_ids']]
+    return meta, arrays
+
+
+class RefitLock:
+    """Cross-process lock so only one worker refits and writes a snapshot at a time."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, LOCK_FILE)
+        self._file = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'w')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import random
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and the event's fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredLogger:
+    """
+    Thin wrapper over logging.Logger: log.info("event", key=value, ...).
+    DEBUG and INFO events are sampled at `sample_rate`; warnings and errors
+    are always emitted. Field values are only formatted when a record is
+    actually written.
+    """
+
+    def __init__(self, logger, sample_rate=1.0):
+        self._logger = logger
+        self.sample_rate = sample_rate
+
+    def _log(self, level, event, fields, exc_info=False):
+        if not self._logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+
+_configured = False
+
+
+def _configure():
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger('recommendation')
+    root.addHandler(handler)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name):
+    _configure()
+    return StructuredLogger(
+        logging.getLogger(f'recommendation.{name}'),
+        sample_rate=float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import scipy.sparse as sp
+from bson.objectid import ObjectId
+
+from interaction_store import IdInterner, InteractionSnapshot
+
+CATEGORIES = [
+    'Mode, accessoires & bijoux', 'Maison & décoration', 'Art & collection',
+    'Cosmétiques & bien-être', 'Textile & tapis', 'Poterie & céramique',
+]
+
+
+# Synthetic users, products and payments with power-law product popularity.
+# Each user mostly buys in a favourite category so the data has learnable structure.
+def generate(n_users=1000, n_products=500, payments_per_user=3.0, items_per_payment=2.0,
+             popularity_exponent=1.1, category_affinity=0.7, seed=42):
+    rng = np.random.default_rng(seed)
+    user_ids = [ObjectId() for _ in range(n_users)]
+    product_ids = [ObjectId() for _ in range(n_products)]
+    product_categories = rng.integers(0, len(CATEGORIES), n_products)
+    products = [
+        {'_id': pid, 'name': f'Produit {i}', 'category': CATEGORIES[product_categories[i]],
+         'price': float(rng.integers(5, 200)), 'stock': int(rng.integers(0, 50))}
+        for i, pid in enumerate(product_ids)
+    ]
+
+    popularity = 1.0 / np.arange(1, n_products + 1) ** popularity_exponent
+    popularity = popularity[rng.permutation(n_products)]
+    global_p = popularity / popularity.sum()
+    by_category = []
+    for c in range(len(CATEGORIES)):
+        members = np.flatnonzero(product_categories == c)
+        weights = popularity[members]
+        by_category.append((members, weights / weights.sum() if len(members) else weights))
+
+    favourite = rng.integers(0, len(CATEGORIES), n_users)
+    activity = rng.pareto(1.5, n_users) + 1.0
+    n_payments = np.maximum(1, np.round(activity / activity.mean() * payments_per_user)).astype(int)
+
+    payments = []
+    for u, count in enumerate(n_payments):
+        members, weights = by_category[favourite[u]]
+        for _ in range(count):
+            n_items = max(1, rng.poisson(items_per_payment - 1) + 1)
+            items = []
+            for _ in range(n_items):
+                if len(members) and rng.random() < category_affinity:
+                    p = rng.choice(members, p=weights)
+                else:
+                    p = rng.choice(n_products, p=global_p)
+                items.append({'_id': product_ids[p], 'quantity': 1})
+            payments.append({'_id': ObjectId(), 'userId': user_ids[u], 'items': items, 'status': 'succeeded'})
+    return {'users': user_ids, 'products': products, 'payments': payments}
+
+
+# Build an InteractionSnapshot straight from payment documents (no database)
+def build_snapshot(payments):
+    users, products = IdInterner(), IdInterner()
+    rows, cols, baskets = [], [], []
+    for b, payment in enumerate(payments):
+        for item in payment['items']:
+            rows.append(users.intern(payment['userId']))
+            cols.append(products.intern(item['_id']))
+            baskets.append(b)
+    shape = (len(users), len(products))
+    ones = np.ones(len(rows), dtype=np.float32)
+    matrix = sp.csr_matrix((ones, (rows, cols)), shape=shape)
+    basket_matrix = sp.csr_matrix((ones, (baskets, cols)), shape=(len(payments), shape[1]))
+    basket_matrix.data[:] = 1.0
+    return InteractionSnapshot(matrix, users, products, 1, len(rows), basket_matrix, payments[-1]['_id'] if payments else None)
+
+
+# Hold out the last payment of every user with at least two payments
+def split_last_payment(payments):
+    last = {}
+    for i, payment in enumerate(payments):
+        last[payment['userId']] = i
+    counts = {}
+    for payment in payments:
+        counts[payment['userId']] = counts.get(payment['userId'], 0) + 1
+    held_out = {i for user, i in last.items() if counts[user] > 1}
+    train = [p for i, p in enumerate(payments) if i not in held_out]
+    test = [p for i, p in enumerate(payments) if i in held_out]
+    return train, test
@@ -0,0 +1,44 @@
+"""
+The API module connects to MongoDB and loads the model at import time, so the
+tests import it once against an in-memory mongomock database seeded with a
+small synthetic catalog and payment history.
+"""
+import os
+import random
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def api_env():
+    import pymongo
+    from bson.objectid import ObjectId
+
+    os.environ['MODEL_SNAPSHOT_DIR'] = tempfile.mkdtemp()
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    db = client['craft_hub']
+
+    rng = random.Random(1)
+    users = [ObjectId() for _ in range(30)]
+    products = [ObjectId() for _ in range(40)]
+    for i, pid in enumerate(products):
+        db.products.insert_one({'_id': pid, 'name': f'p{i}', 'category': 'ABC'[i % 3], 'stock': i % 5})
+    for _ in range(120):
+        items = [{'_id': rng.choice(products), 'quantity': 1} for _ in range(rng.randint(1, 3))]
+        db.payments.insert_one({'userId': rng.choice(users[:25]), 'items': items, 'status': 'succeeded'})
+
+    import recommendation
+    recommendation.interaction_store.stop()
+    recommendation.model_manager.stop()
+    return SimpleNamespace(
+        api=recommendation, db=db, client=recommendation.app.test_client(),
+        users=[str(u) for u in users], products=[str(p) for p in products]
+    )
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+
+def post_batch(api_env, **body):
+    return api_env.client.post('/recommend/batch', json=body)
+
+
+@pytest.mark.parametrize('body, error', [
+    ({}, 'No JSON data provided'),
+    ({'userIds': []}, 'userIds must be a non-empty list'),
+    ({'userIds': 'abc'}, 'userIds must be a non-empty list'),
+    ({'userIds': ['not-an-id']}, 'Valid User IDs (24-character ObjectId) required'),
+    ({'limit': 0}, 'limit must be a positive integer'),
+    ({'limit': '5'}, 'limit must be a positive integer'),
+    ({'limit': 2.5}, 'limit must be a positive integer'),
+    ({'limit': True}, 'limit must be a positive integer'),
+    ({'limit': False}, 'limit must be a positive integer'),
+])
+def test_batch_validation(api_env, body, error):
+    if 'limit' in body:
+        body = dict(body, userIds=api_env.users[:2])
+    response = post_batch(api_env, **body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_batch_streams_one_line_per_user(api_env):
+    response = post_batch(api_env, userIds=api_env.users, limit=3)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['userId'] for line in lines] == api_env.users
+    assert all(len(line['recommendations']) <= 3 for line in lines)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+from bson.objectid import ObjectId
+
+from precompute import RECOMMENDATIONS
+
+
+def materialize(env, user_id, product_ids, computed_at, model_version):
+    env.db[RECOMMENDATIONS].replace_one(
+        {'_id': ObjectId(user_id)},
+        {'productIds': product_ids, 'modelVersion': model_version, 'computedAt': computed_at},
+        upsert=True
+    )
+
+
+def unpurchased(env, user_id, snapshot):
+    purchased = set(snapshot.purchased_products(user_id))
+    return [pid for pid in env.products if pid not in purchased]
+
+
+def test_row_still_served_after_refit(api_env):
+    api, manager = api_env.api, api_env.api.model_manager
+    user_id = api_env.users[0]
+    snapshot = api.interaction_store.snapshot
+    product_ids = unpurchased(api_env, user_id, snapshot)[:3]
+    materialize(api_env, user_id, product_ids, datetime.now(timezone.utc), manager.model.version)
+
+    # The API refits on its own schedule after the job ran
+    job_version = manager.model.version
+    manager.refit()
+    assert manager.model.version > job_version
+
+    served = api.get_materialized_recommendations(user_id, snapshot)
+    assert [str(p['_id']) for p in served] == product_ids
+
+
+def test_expired_row_is_ignored(api_env):
+    api = api_env.api
+    user_id = api_env.users[1]
+    snapshot = api.interaction_store.snapshot
+    computed_at = datetime.now(timezone.utc) - timedelta(seconds=api.MATERIALIZED_MAX_AGE + 60)
+    materialize(api_env, user_id, unpurchased(api_env, user_id, snapshot)[:3], computed_at,
+                api.model_manager.model.version)
+
+    assert api.get_materialized_recommendations(user_id, snapshot) is None
+
+
+def test_purchased_products_are_filtered(api_env):
+    api = api_env.api
+    user_id = api_env.users[2]
+    snapshot = api.interaction_store.snapshot
+    purchased = snapshot.purchased_products(user_id)
+    fresh = unpurchased(api_env, user_id, snapshot)[:2]
+    materialize(api_env, user_id, list(purchased)[:1] + fresh, datetime.now(timezone.utc),
+                api.model_manager.model.version)
+
+    served = api.get_materialized_recommendations(user_id, snapshot)
+    assert [str(p['_id']) for p in served] == fresh
@@ -0,0 +1,12 @@
+from model_manager import ModelManager
+
+
+def test_components_default_per_engine(monkeypatch):
+    monkeypatch.delenv('MODEL_COMPONENTS', raising=False)
+    monkeypatch.delenv('ALS_COMPONENTS', raising=False)
+    monkeypatch.setenv('MODEL_ENGINE', 'svd')
+    assert ModelManager.from_env(None).n_components == 2
+    monkeypatch.setenv('MODEL_ENGINE', 'als')
+    assert ModelManager.from_env(None).n_components == 32
+    monkeypatch.setenv('ALS_COMPONENTS', '64')
+    assert ModelManager.from_env(None).n_components == 64
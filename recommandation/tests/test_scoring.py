@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def test_zero_score_products_leave_room_for_item_fill(api_env, monkeypatch):
+    api = api_env.api
+    model = api.model_manager.model
+    snapshot = api.interaction_store.snapshot
+    matrix = model.snapshot.matrix.tocsr()
+
+    # A known user and a neighbour who bought a single product the user has not
+    for user_id in model.snapshot.user_ids:
+        purchased = set(snapshot.purchased_products(user_id))
+        item_fill = [pid for pid in model.recommend_from_items(list(purchased), n=5) if pid not in purchased]
+        if model.user_vector(user_id, snapshot) is None or not item_fill:
+            continue
+        neighbour = next((row for row in range(matrix.shape[0])
+                          if matrix[row].nnz == 1
+                          and model.snapshot.product_ids[matrix[row].indices[0]] not in purchased), None)
+        if neighbour is not None:
+            break
+    else:
+        raise AssertionError('no suitable user in the synthetic data')
+    bought_by_neighbour = model.snapshot.product_ids[matrix[neighbour].indices[0]]
+    monkeypatch.setattr(model, 'similar_users', lambda *args, **kwargs: np.array([neighbour]))
+
+    body, status = api.compute_recommendations(user_id, model, snapshot)
+
+    assert status == 200
+    expected = list(dict.fromkeys([bought_by_neighbour] + item_fill))[:5]
+    assert [str(p['_id']) for p in body['recommendations']][:len(expected)] == expected
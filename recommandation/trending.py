@@ -0,0 +1,110 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from bson.objectid import ObjectId
+
+from interaction_store import IdInterner, payment_time
+from metrics import metrics
+from structured_logging import get_logger
+
+log = get_logger('trending')
+
+
+class TrendingIndex:
+    """
+    Time-decayed purchase counts, global and per category, for users the
+    model knows nothing about. Each purchase adds exp(decay * (t - origin)):
+    every score decays by the same factor over time, so the ranking only has
+    to change when new purchases arrive. Rankings are small sorted lists of
+    product ids, rebuilt at most every rank_interval seconds.
+    """
+
+    def __init__(self, half_life_days=7.0, size=50, rank_interval=60.0, category_of=None):
+        self.decay = math.log(2) / (half_life_days * 86400)
+        self.half_life_days = half_life_days
+        self.size = size
+        self.rank_interval = rank_interval
+        self.category_of = category_of or (lambda product_id: None)
+        self._lock = threading.Lock()
+        self._products = IdInterner()
+        self._scores = np.zeros(1024, dtype=np.float64)
+        self._origin = time.time()
+        self._dirty = False
+        self._ranked_at = 0.0
+        self._global = []
+        self._by_category = {}
+
+    # Add purchase rows (product id, payment time in seconds)
+    def add(self, product_ids, timestamps):
+        if not len(product_ids):
+            return
+        with self._lock:
+            codes = np.fromiter((self._products.intern(pid) for pid in product_ids), dtype=np.int64,
+                                count=len(product_ids))
+            if len(self._products) > len(self._scores):
+                grown = np.zeros(max(len(self._products), 2 * len(self._scores)), dtype=np.float64)
+                grown[:len(self._scores)] = self._scores
+                self._scores = grown
+            exponents = self.decay * (np.asarray(timestamps, dtype=np.float64) - self._origin)
+            if exponents.max() > 500:
+                # Move the origin forward before exp() overflows; ratios between scores are unchanged
+                shift = exponents.max()
+                self._scores *= math.exp(-shift)
+                self._origin += shift / self.decay
+                exponents -= shift
+            np.add.at(self._scores, codes, np.exp(exponents))
+            self._dirty = True
+
+    # Backfill from payments recent enough to still count (ignores anything older than `half_lives`)
+    def load(self, db, until_id=None, half_lives=8, batch_size=5000):
+        since = ObjectId.from_datetime(
+            datetime.fromtimestamp(time.time() - half_lives * self.half_life_days * 86400, timezone.utc)
+        )
+        query = {'_id': {'$gt': since}}
+        if until_id is not None:
+            query['_id']['$lte'] = until_id
+        product_ids, timestamps = [], []
+        with metrics.timed('trending_load'):
+            for payment in db.payments.find(query, {'items._id': 1}).batch_size(batch_size):
+                when = payment_time(payment.get('_id'))
+                for item in payment.get('items') or []:
+                    product_id = item.get('_id') if isinstance(item, dict) else None
+                    if product_id is not None:
+                        product_ids.append(str(product_id))
+                        timestamps.append(when)
+            self.add(product_ids, timestamps)
+        log.info("trending_loaded", rows=len(product_ids), products=len(self._products))
+
+    def _rank(self):
+        with self._lock:
+            scores = self._scores[:len(self._products)].copy()
+            ids = self._products.ids
+            self._dirty = False
+        order = np.argsort(-scores, kind='stable')
+        order = order[scores[order] > 0]
+        by_category = {}
+        for code in order:
+            category = self.category_of(ids[code])
+            if category:
+                ranked = by_category.setdefault(category, [])
+                if len(ranked) < self.size:
+                    ranked.append(ids[code])
+        self._global = [ids[code] for code in order[:self.size]]
+        self._by_category = by_category
+        self._ranked_at = time.time()
+
+    # Most popular product ids right now, overall or within one category
+    def top(self, category=None, n=None):
+        if not self._ranked_at or (self._dirty and time.time() - self._ranked_at >= self.rank_interval):
+            self._rank()
+        ranked = self._global if category is None else self._by_category.get(category, [])
+        return ranked[:n] if n is not None else list(ranked)
+
+    def stats(self):
+        return {
+            'products': len(self._products), 'halfLifeDays': self.half_life_days,
+            'rankedAt': self._ranked_at, 'categories': len(self._by_category),
+        }